@@ -1,17 +1,48 @@
+from core.cache import get_content_version, recipe_key
+from core.metrics import count_cache
+from core.similarity import store_signatures
+from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from django.db import transaction
+from django.db.models import F, IntegerField, QuerySet, Value
+from django.urls import reverse
 from djoser.serializers import UserCreateSerializer, UserSerializer
 from drf_extra_fields.fields import Base64ImageField
+from food_recipies.models import (Favorites, Ingredients,
+                                  QuantityOfIngredients, Recipies,
+                                  ShoppingList, ShoppingListExport, Tags)
 from rest_framework import serializers
-
-from ..food_recipies.models import (Favorites, Ingredients,
-                                    QuantityOfIngredients, Recipies,
-                                    ShoppingList, Tags)
-from ..users.models import Follower
+from users.models import Follower
 
 User = get_user_model()
 
 
+def sparse_fields(request, fields):
+    selected = list(fields)
+    requested = request.query_params.get('fields')
+    if requested:
+        requested = set(requested.split(','))
+        selected = [name for name in selected if name in requested]
+    omitted = request.query_params.get('omit')
+    if omitted:
+        omitted = set(omitted.split(','))
+        selected = [name for name in selected if name not in omitted]
+    return selected
+
+
+class SparseFieldsMixin:
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self.context.get('request')
+        if request is not None and hasattr(request, 'query_params'):
+            selected = set(sparse_fields(request, self.fields))
+            for name in list(self.fields):
+                if name not in selected:
+                    self.fields.pop(name)
+
+
 class UsersPostsSerializer(UserCreateSerializer):
     class Meta:
         model = User
@@ -19,7 +50,7 @@ class UsersPostsSerializer(UserCreateSerializer):
                   'password']
 
 
-class CustomUsersSerializer(UserSerializer):
+class CustomUsersSerializer(SparseFieldsMixin, UserSerializer):
     is_subscribed = serializers.SerializerMethodField(
         method_name='get_is_subscribed')
 
@@ -32,10 +63,12 @@ class CustomUsersSerializer(UserSerializer):
         request = self.context.get('request')
         if request is None or request.user.is_anonymous:
             return False
+        if hasattr(obj, 'subscribed'):
+            return obj.subscribed
         return Follower.objects.filter(user=request.user, author=obj).exists()
 
 
-class FollowsSerializer(serializers.ModelSerializer):
+class FollowsSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     email = serializers.ReadOnlyField(source='author.email')
     id = serializers.ReadOnlyField(source='author.id')
     username = serializers.ReadOnlyField(source='author.username')
@@ -69,6 +102,8 @@ class FollowsSerializer(serializers.ModelSerializer):
         return serializer.data
 
     def get_recipes_count(self, obj):
+        if hasattr(obj, 'author_recipes_count'):
+            return obj.author_recipes_count
         return obj.author.recipes.count()
 
 
@@ -92,6 +127,10 @@ class FollowersSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError('Error')
         return data
 
+    @transaction.atomic
+    def save(self, **kwargs):
+        return super().save(**kwargs)
+
     def to_representation(self, instance):
         request = self.context.get('request')
         context = {'request': request}
@@ -99,11 +138,22 @@ class FollowersSerializer(serializers.ModelSerializer):
         return serializer.data
 
 
+class ValuesListSerializer(serializers.ListSerializer):
+    # Read-only lists of plain columns are built straight from .values()
+    # rows, skipping model instances and per-field to_representation.
+
+    def to_representation(self, data):
+        if isinstance(data, QuerySet):
+            return list(data.values(*self.child.Meta.fields))
+        return super().to_representation(data)
+
+
 class TagsSerializer(serializers.ModelSerializer):
     class Meta:
         model = Tags
         fields = ['id', 'name', 'color', 'slug']
         read_only_fields = ['id', 'name', 'color', 'slug']
+        list_serializer_class = ValuesListSerializer
 
 
 class IngredientsSerializer(serializers.ModelSerializer):
@@ -111,6 +161,7 @@ class IngredientsSerializer(serializers.ModelSerializer):
         model = Ingredients
         fields = ['id', 'name', 'measurement_unit']
         read_only_fields = ['id', 'name', 'measurement_unit']
+        list_serializer_class = ValuesListSerializer
 
 
 class NewIngredientsSerializer(serializers.ModelSerializer):
@@ -158,8 +209,9 @@ class NewRecipesSerializer(serializers.ModelSerializer):
         tags = validated_data.pop('tags')
         recipies = Recipies.objects.create(**validated_data)
         self.bulk_create_ingredients(ingredients, recipies)
+        store_signatures({recipies.id: [
+            ingredient['ingredient'].id for ingredient in ingredients]})
         recipies.tags.set(tags)
-        recipies.save()
         return recipies
 
     @transaction.atomic
@@ -168,6 +220,8 @@ class NewRecipesSerializer(serializers.ModelSerializer):
         tags = validated_data.pop('tags')
         QuantityOfIngredients.objects.filter(recipe=instance).delete()
         self.bulk_create_ingredients(ingredients, instance)
+        store_signatures({instance.id: [
+            ingredient['ingredient'].id for ingredient in ingredients]})
         instance.name = validated_data.pop('name')
         instance.text = validated_data.pop('text')
         if validated_data.get('image') is not None:
@@ -189,34 +243,176 @@ class IngredientsQuantitySerializer(serializers.ModelSerializer):
         fields = ['id', 'name', 'measurement_unit', 'amount']
 
 
-class RecipesSerializer(serializers.ModelSerializer):
+FAVORITED, IN_CART, SUBSCRIBED = range(3)
+RELATED_FIELDS = {'author', 'tags', 'ingredients'}
+
+
+def user_overlay(user, recipes, kinds):
+    recipe_ids = [recipe.id for recipe in recipes]
+    sources = {
+        FAVORITED: Favorites.objects.filter(
+            user=user, recipe__in=recipe_ids).annotate(target=F('recipe_id')),
+        IN_CART: ShoppingList.objects.filter(
+            user=user, recipe__in=recipe_ids).annotate(target=F('recipe_id')),
+        SUBSCRIBED: Follower.objects.filter(
+            user=user, author__in={recipe.author_id for recipe in recipes}
+        ).annotate(target=F('author_id')),
+    }
+    marks = [
+        sources[kind].annotate(
+            kind=Value(kind, IntegerField())
+        ).values_list('kind', 'target')
+        for kind in kinds
+    ]
+    if not marks:
+        return set()
+    return set(marks[0].union(*marks[1:], all=True))
+
+
+def recipe_fragments(recipes):
+    # Same shape as RecipesSerializer output, assembled from .values()
+    # rows in three queries instead of prefetching and running the nested
+    # serializers per recipe.
+    recipe_ids = [recipe.id for recipe in recipes]
+    authors = {
+        author['id']: dict(author, is_subscribed=False)
+        for author in User.objects.filter(
+            id__in={recipe.author_id for recipe in recipes}
+        ).values('email', 'id', 'username', 'first_name', 'last_name')
+    }
+    tags = {recipe_id: [] for recipe_id in recipe_ids}
+    for recipe_id, *tag in Recipies.tags.through.objects.filter(
+        recipies__in=recipe_ids
+    ).order_by('tags__name').values_list(
+        'recipies_id', 'tags__id', 'tags__name', 'tags__color', 'tags__slug'
+    ):
+        tags[recipe_id].append(dict(zip(TagsSerializer.Meta.fields, tag)))
+    ingredients = {recipe_id: [] for recipe_id in recipe_ids}
+    for recipe_id, *ingredient in QuantityOfIngredients.objects.filter(
+        recipe__in=recipe_ids
+    ).order_by('id').values_list(
+        'recipe_id', 'ingredient_id', 'ingredient__name',
+        'ingredient__measurement_unit', 'amount'
+    ):
+        ingredients[recipe_id].append(dict(zip(
+            IngredientsQuantitySerializer.Meta.fields, ingredient)))
+    return {
+        recipe.id: {
+            'id': recipe.id,
+            'tags': tags[recipe.id],
+            'name': recipe.name,
+            'author': authors[recipe.author_id],
+            'ingredients': ingredients[recipe.id],
+            'image': recipe.image.url if recipe.image else None,
+            'text': recipe.text,
+            'cooking_time': recipe.cooking_time,
+        }
+        for recipe in recipes
+    }
+
+
+class RecipesListSerializer(serializers.ListSerializer):
+
+    def to_representation(self, data):
+        return self.child.represent_many(list(data))
+
+
+class RecipesSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     author = CustomUsersSerializer()
     tags = TagsSerializer(many=True, )
     ingredients = IngredientsQuantitySerializer(source='ingredient_in_recipe',
                                                 read_only=True, many=True)
     image = Base64ImageField()
-    is_favorited = serializers.SerializerMethodField(
-        method_name='get_is_favorited')
-    is_in_shopping_cart = serializers.SerializerMethodField(
-        method_name='get_is_in_shopping_cart')
+    # Filled in by represent_many from user_overlay.
+    is_favorited = serializers.SerializerMethodField()
+    is_in_shopping_cart = serializers.SerializerMethodField()
 
     class Meta:
         model = Recipies
         fields = ['id', 'tags', 'name', 'author', 'ingredients', 'image',
                   'text', 'cooking_time', 'is_favorited', 'is_in_shopping_cart'
                   ]
+        list_serializer_class = RecipesListSerializer
 
-    def is_exists_in(self, obj, model):
+    def to_representation(self, instance):
+        return self.represent_many([instance])[0]
+
+    def cached_fragments(self, recipes):
+        version = get_content_version()
+        keys = {recipe.id: recipe_key(recipe.id, version)
+                for recipe in recipes}
+        fragments = cache.get_many(keys.values())
+        missing = [recipe for recipe in recipes
+                   if keys[recipe.id] not in fragments]
+        count_cache('recipe', len(recipes) - len(missing), len(missing))
+        if missing:
+            rendered = {
+                keys[recipe_id]: fragment
+                for recipe_id, fragment in recipe_fragments(missing).items()
+            }
+            cache.set_many(rendered, settings.RECIPE_CACHE_TIMEOUT)
+            fragments.update(rendered)
+        return {recipe.id: fragments[keys[recipe.id]] for recipe in recipes}
+
+    def column_fragments(self, recipes):
+        fragments = {}
+        for recipe in recipes:
+            fragment = fragments[recipe.id] = {}
+            for name, field in self.fields.items():
+                if isinstance(field, serializers.SerializerMethodField):
+                    continue
+                attribute = field.get_attribute(recipe)
+                fragment[name] = (None if attribute is None
+                                  else field.to_representation(attribute))
+        return fragments
+
+    def represent_many(self, recipes):
+        if RELATED_FIELDS.intersection(self.fields):
+            fragments = self.cached_fragments(recipes)
+        else:
+            fragments = self.column_fragments(recipes)
+        kinds = [kind for kind, name in (
+            (FAVORITED, 'is_favorited'),
+            (IN_CART, 'is_in_shopping_cart'),
+            (SUBSCRIBED, 'author'),
+        ) if name in self.fields]
         request = self.context.get('request')
-        if request is None or request.user.is_anonymous:
-            return False
-        return model.objects.filter(user=request.user, recipe=obj).exists()
+        marks = set()
+        if request is not None and request.user.is_authenticated:
+            marks = user_overlay(request.user, recipes, kinds)
+        data = []
+        for recipe in recipes:
+            fragment = fragments[recipe.id]
+            item = {}
+            for name in self.fields:
+                if name == 'is_favorited':
+                    item[name] = (FAVORITED, recipe.id) in marks
+                elif name == 'is_in_shopping_cart':
+                    item[name] = (IN_CART, recipe.id) in marks
+                else:
+                    item[name] = fragment[name]
+            if 'author' in item:
+                item['author'] = dict(
+                    item['author'],
+                    is_subscribed=(SUBSCRIBED, recipe.author_id) in marks)
+            if request is not None and item.get('image'):
+                item['image'] = request.build_absolute_uri(item['image'])
+            data.append(item)
+        return data
 
-    def get_is_favorited(self, obj):
-        return self.is_exists_in(obj, Favorites)
 
-    def get_is_in_shopping_cart(self, obj):
-        return self.is_exists_in(obj, ShoppingList)
+class ShoppingListExportSerializer(serializers.ModelSerializer):
+    file = serializers.SerializerMethodField(method_name='get_file')
+
+    class Meta:
+        model = ShoppingListExport
+        fields = ['id', 'status', 'attempts', 'error', 'created', 'file']
+
+    def get_file(self, obj):
+        if obj.status != ShoppingListExport.DONE:
+            return None
+        return self.context['request'].build_absolute_uri(reverse(
+            'api:shopping-list-export-file', args=[obj.id]))
 
 
 class PasswordSerializer(serializers.Serializer):
@@ -1,7 +1,9 @@
 from django.urls import include, path
 from rest_framework.routers import SimpleRouter
-from views import (FollowToView, FollowView, IngredientViewSet, RecipeViewSet,
-                   TagViewSet, UserViewSet)
+
+from .views import (ChangesView, EventsTicketView, FollowToView, FollowView,
+                    IngredientViewSet, RecipeViewSet, ShoppingListExportView,
+                    TagViewSet, UserViewSet)
 
 app_name = 'api'
 
@@ -16,6 +18,13 @@ router.register('recipes', RecipeViewSet, basename='recipes')
 urlpatterns = [
     path('users/subscriptions/', FollowView.as_view()),
     path('users/<int:pk>/subscribe/', FollowToView.as_view()),
+    path('changes/', ChangesView.as_view()),
+    path('events_ticket/', EventsTicketView.as_view()),
+    path('recipes/download_shopping_cart/<int:pk>/',
+         ShoppingListExportView.as_view()),
+    path('recipes/download_shopping_cart/<int:pk>/file/',
+         ShoppingListExportView.as_view(), {'download': True},
+         name='shopping-list-export-file'),
     path('', include(router.urls)),
     path('auth/', include('djoser.urls.authtoken')),
 ]
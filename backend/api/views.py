@@ -1,49 +1,96 @@
+from core.cache import (CONTENT_VERSION_KEY, LISTING_VERSION_KEY,
+                        CachedListMixin)
+from core.changes import settled_before
+from core.events import issue_ticket
+from core.exports import enqueue
+from core.facets import recipe_facets
+from core.feed import timeline_recipes
 from core.filters import RecipeFilter
+from core.follow_graph import follow_suggestions
+from core.idempotency import idempotent
+from core.ingredient_index import ingredient_index
 from core.pagination import CustomPagination
 from core.pdf import getpdf
+from core.purge import hide_recipes, hide_users
+from core.similarity import similar
+from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.db.models import Sum
+from django.db import transaction
+from django.db.models import Count, Exists, Max, OuterRef, Q, Sum
+from django.http import FileResponse
 from django.shortcuts import get_object_or_404
 from django_filters.rest_framework import DjangoFilterBackend
-from food_recipies.models import (Favorites, Ingredients,
-                                  QuantityOfIngredients, Recipies,
-                                  ShoppingList, Tags)
+from food_recipies.models import (ChangeLog, Favorites, Ingredients,
+                                  PopularRecipes, QuantityOfIngredients,
+                                  Recipies, ShoppingList, ShoppingListExport,
+                                  Tags)
 from rest_framework import filters, status, views, viewsets
 from rest_framework.decorators import action
 from rest_framework.generics import ListAPIView
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.validators import ValidationError
+from users.models import Follower
 
-from ..users.models import Follower
 from .permissions import IsAdminOrReadOnly, IsOwnerOrReadOnly
-from .serializers import (CustomUsersSerializer, FollowersSerializer,
-                          FollowsSerializer, IngredientsSerializer,
-                          NewRecipesSerializer, PasswordSerializer,
-                          RecipeSerializer, TagsSerializer,
-                          UsersPostsSerializer)
+from .serializers import (RELATED_FIELDS, CustomUsersSerializer,
+                          FollowersSerializer, FollowsSerializer,
+                          IngredientsSerializer, NewRecipesSerializer,
+                          PasswordSerializer, RecipeSerializer,
+                          RecipesSerializer, ShoppingListExportSerializer,
+                          TagsSerializer, UsersPostsSerializer, sparse_fields)
 
 User = get_user_model()
 
 
 class UserViewSet(viewsets.ModelViewSet):
-    queryset = User.objects.all()
+    queryset = User.objects.filter(is_active=True)
     permission_classes = [AllowAny]
     pagination_class = CustomPagination
 
     def get_serializer_class(self):
-        if self.action in ['list', 'retrieve']:
+        if self.action in ['list', 'retrieve', 'suggestions']:
             return CustomUsersSerializer
         return UsersPostsSerializer
 
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        user = self.request.user
+        if (self.action in ['list', 'retrieve', 'suggestions']
+                and user.is_authenticated
+                and 'is_subscribed' in sparse_fields(
+                    self.request, CustomUsersSerializer.Meta.fields)):
+            queryset = queryset.annotate(subscribed=Exists(
+                Follower.objects.filter(user=user, author=OuterRef('pk'))))
+        return queryset
+
+    def perform_destroy(self, instance):
+        hide_users([instance.pk])
+
     @action(
         detail=False, methods=['GET'], permission_classes=[IsAuthenticated]
     )
     def me(self, request):
-        user = get_object_or_404(User, pk=request.user.id)
-        serializer = CustomUsersSerializer(user)
+        serializer = CustomUsersSerializer(request.user)
         return Response(serializer.data)
 
+    @action(
+        detail=False, methods=['GET'], permission_classes=[IsAuthenticated]
+    )
+    def suggestions(self, request):
+        scores = follow_suggestions(request.user.id)
+        users = self.get_queryset().exclude(
+            following__user=request.user
+        ).in_bulk([user_id for user_id, score in scores])
+        scores = [(score, users[user_id]) for user_id, score in scores
+                  if user_id in users]
+        serializer = self.get_serializer(
+            [user for score, user in scores], many=True)
+        data = serializer.data
+        for item, (score, user) in zip(data, scores):
+            item['score'] = score
+        return Response(data)
+
     @action(detail=False, methods=['POST'])
     def set_password(self, request):
         user = self.request.user
@@ -62,13 +109,22 @@ class FollowView(ListAPIView):
 
     def get_queryset(self):
         user = self.request.user
-        return user.follower.all()
+        queryset = user.follower.filter(
+            author__is_active=True).select_related('author')
+        if 'recipes_count' in sparse_fields(
+                self.request, FollowsSerializer.Meta.fields):
+            # Joins bypass RecipeManager, so hidden recipes are left out here.
+            queryset = queryset.annotate(author_recipes_count=Count(
+                'author__recipes',
+                filter=Q(author__recipes__hidden=False)))
+        return queryset
 
 
 class FollowToView(views.APIView):
     pagination_class = CustomPagination
     permission_classes = [IsAuthenticated]
 
+    @idempotent
     def post(self, request, pk):
         author = get_object_or_404(User, pk=pk)
         user = self.request.user
@@ -80,7 +136,7 @@ class FollowToView(views.APIView):
         serializer.save()
         return Response(data=serializer.data, status=status.HTTP_201_CREATED)
 
-    def delete(self, pk):
+    def delete(self, request, pk):
         author = get_object_or_404(User, pk=pk)
         user = self.request.user
         following = get_object_or_404(
@@ -90,13 +146,86 @@ class FollowToView(views.APIView):
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
-class TagViewSet(viewsets.ReadOnlyModelViewSet):
+class ChangesView(views.APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        since = request.query_params.get('since', '0')
+        limit = request.query_params.get(
+            'limit', str(settings.CHANGES['PAGE_SIZE']))
+        if not (since.isdigit() and limit.isdigit()):
+            raise ValidationError('since and limit must be integers')
+        since = int(since)
+        limit = min(int(limit), settings.CHANGES['MAX_PAGE_SIZE'])
+        horizon = ChangeLog.objects.filter(
+            kind=ChangeLog.COMPACTED
+        ).aggregate(horizon=Max('object_id'))['horizon'] or 0
+        settled = ChangeLog.objects.filter(created__lt=settled_before())
+        if since < horizon:
+            return Response({
+                'detail': 'Cursor expired, full resync required',
+                'cursor': settled.aggregate(cursor=Max('id'))['cursor'] or 0,
+            }, status=status.HTTP_410_GONE)
+        changes = list(settled.filter(
+            Q(user=None) | Q(user=request.user), id__gt=since
+        ).exclude(kind=ChangeLog.COMPACTED)[:limit + 1])
+        has_more = len(changes) > limit
+        changes = changes[:limit]
+        recipes = Recipies.objects.in_bulk({
+            change.object_id for change in changes
+            if change.kind == ChangeLog.RECIPE and not change.deleted
+        })
+        serializer = RecipesSerializer(
+            list(recipes.values()), many=True, context={'request': request})
+        recipes = dict(zip(recipes, serializer.data))
+        return Response({
+            'cursor': changes[-1].id if changes else since,
+            'has_more': has_more,
+            'changes': [{
+                'cursor': change.id,
+                'type': change.kind,
+                'action': 'delete' if change.deleted else 'upsert',
+                'id': change.object_id,
+                'data': (recipes.get(change.object_id)
+                         if change.kind == ChangeLog.RECIPE else None),
+            } for change in changes],
+        })
+
+
+class EventsTicketView(views.APIView):
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        return Response({
+            'ticket': issue_ticket(request.user),
+            'expires_in': settings.EVENTS['TICKET_TTL'],
+        }, status=status.HTTP_201_CREATED)
+
+
+class ShoppingListExportView(views.APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, pk, download=False):
+        job = get_object_or_404(ShoppingListExport, pk=pk, user=request.user)
+        if not download:
+            serializer = ShoppingListExportSerializer(
+                job, context={'request': request})
+            return Response(serializer.data)
+        if job.status != ShoppingListExport.DONE:
+            return Response({'detail': 'Export is not ready'},
+                            status=status.HTTP_409_CONFLICT)
+        return FileResponse(job.file.open('rb'), as_attachment=True,
+                            filename='shopping_list.pdf',
+                            content_type='application/pdf')
+
+
+class TagViewSet(CachedListMixin, viewsets.ReadOnlyModelViewSet):
     queryset = Tags.objects.all()
     serializer_class = TagsSerializer
     permission_classes = [IsAdminOrReadOnly]
 
 
-class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
+class IngredientViewSet(CachedListMixin, viewsets.ReadOnlyModelViewSet):
     class CustomSearchFilter(filters.SearchFilter):
         search_param = 'name'
 
@@ -106,44 +235,133 @@ class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
     filter_backends = [CustomSearchFilter]
 
 
-class RecipeViewSet(viewsets.ModelViewSet):
+class RecipeViewSet(CachedListMixin, viewsets.ModelViewSet):
     queryset = Recipies.objects.all()
     permission_classes = [IsOwnerOrReadOnly]
     pagination_class = CustomPagination
     filter_backends = [DjangoFilterBackend]
     filterset_class = RecipeFilter
+    cache_versions = (CONTENT_VERSION_KEY, LISTING_VERSION_KEY)
+
+    def is_cacheable(self, request):
+        return request.user.is_anonymous and super().is_cacheable(request)
 
     def get_serializer_class(self):
-        if self.action in ['list', 'retrieve']:
-            return RecipeSerializer
+        if self.action in ['list', 'retrieve', 'popular', 'cook', 'similar',
+                           'feed']:
+            return RecipesSerializer
         return NewRecipesSerializer
 
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.get_serializer_class() is RecipesSerializer:
+            fields = sparse_fields(self.request, RecipesSerializer.Meta.fields)
+            if 'text' not in fields and not RELATED_FIELDS.intersection(
+                    fields):
+                queryset = queryset.defer('text')
+        return queryset
+
+    @idempotent
+    def create(self, request, *args, **kwargs):
+        return super().create(request, *args, **kwargs)
+
     def perform_create(self, serializer):
         user = self.request.user
         serializer.save(author=user)
 
+    def perform_destroy(self, instance):
+        hide_recipes([instance.pk])
+
     @action(
         detail=True,
         methods=['POST', 'DELETE'],
         permission_classes=[IsAuthenticated]
     )
+    @idempotent
     def favorite(self, request, pk=None):
         if request.method == 'POST':
-            return self.add_recipe(Favorites, request, pk)
-        return self.delete_recipe(Favorites, request, pk)
+            return self.add_recipe(Favorites, pk)
+        return self.delete_recipe(Favorites, pk)
 
     @action(
         detail=True,
         methods=['POST', 'DELETE'],
         permission_classes=[IsAuthenticated]
     )
+    @idempotent
     def shopping_cart(self, request, pk):
         if request.method == 'POST':
-            return self.add_recipe(ShoppingList, request, pk)
-        return self.delete_recipe(ShoppingList, request, pk)
+            return self.add_recipe(ShoppingList, pk)
+        return self.delete_recipe(ShoppingList, pk)
+
+    @action(detail=False)
+    def popular(self, request):
+        window = request.query_params.get('window', PopularRecipes.WEEK)
+        if window not in dict(PopularRecipes.WINDOWS):
+            raise ValidationError({'window': 'Unknown window'})
+        queryset = self.filter_queryset(self.get_queryset()).filter(
+            popularity__window=window
+        ).order_by('popularity__rank')
+        page = self.paginate_queryset(queryset)
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
+
+    @action(detail=False)
+    def facets(self, request):
+        return Response(recipe_facets(request))
+
+    @action(detail=False)
+    def cook(self, request):
+        ingredients = request.query_params.getlist('ingredients')
+        max_missing = request.query_params.get('max_missing', '0')
+        if not all(value.isdigit() for value in ingredients + [max_missing]):
+            raise ValidationError('Ingredients and max_missing must be ids')
+        matches = ingredient_index.search(
+            map(int, ingredients),
+            min(int(max_missing), settings.COOK_MAX_MISSING),
+            settings.COOK_RESULTS_LIMIT,
+        )
+        page = self.paginate_queryset(matches)
+        recipes = Recipies.objects.in_bulk([pk for pk, missing in page])
+        page = [(recipes[pk], missing) for pk, missing in page
+                if pk in recipes]
+        serializer = self.get_serializer(
+            [recipe for recipe, missing in page], many=True)
+        data = serializer.data
+        for item, (recipe, missing) in zip(data, page):
+            item['missing'] = missing
+        return self.get_paginated_response(data)
+
+    @action(detail=True)
+    def similar(self, request, pk=None):
+        recipe = get_object_or_404(Recipies, pk=pk)
+        scores = similar(recipe.id, settings.SIMILAR_RECIPES_LIMIT)
+        recipes = Recipies.objects.in_bulk(
+            [recipe_id for score, recipe_id in scores])
+        scores = [(score, recipes[recipe_id]) for score, recipe_id in scores
+                  if recipe_id in recipes]
+        serializer = self.get_serializer(
+            [recipe for score, recipe in scores], many=True)
+        data = serializer.data
+        for item, (score, recipe) in zip(data, scores):
+            item['similarity'] = round(score, 2)
+        return Response(data)
 
     @action(detail=False, permission_classes=(IsAuthenticated,))
+    def feed(self, request):
+        queryset = self.filter_queryset(timeline_recipes(request.user))
+        page = self.paginate_queryset(queryset)
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
+
+    @action(detail=False, methods=['GET', 'POST'],
+            permission_classes=(IsAuthenticated,))
     def download_shopping_cart(self, request):
+        if request.method == 'POST':
+            job = enqueue(request.user)
+            serializer = ShoppingListExportSerializer(
+                job, context={'request': request})
+            return Response(serializer.data, status=status.HTTP_202_ACCEPTED)
         ingredients = QuantityOfIngredients.objects.filter(
             recipe__carts__user=request.user
         ).values(
@@ -153,6 +371,7 @@ class RecipeViewSet(viewsets.ModelViewSet):
         ).annotate(ingredient_amount=Sum('amount'))
         return getpdf(ingredients)
 
+    @transaction.atomic
     def add_recipe(self, model, pk):
         recipie = get_object_or_404(Recipies, pk=pk)
         user = self.request.user
@@ -0,0 +1,43 @@
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+from .cache import LRUCache
+from .metrics import count_cache
+
+CACHE_PREFIX = 'auth_token:'
+
+local_tokens = LRUCache(settings.TOKEN_CACHE['MAX_SIZE'],
+                        settings.TOKEN_CACHE['LOCAL_TIMEOUT'])
+
+
+def invalidate_token(key):
+    local_tokens.delete(key)
+    cache.delete(CACHE_PREFIX + key)
+
+
+def invalidate_user(user):
+    for key in Token.objects.filter(user=user).values_list('key', flat=True):
+        invalidate_token(key)
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+
+    def authenticate_credentials(self, key):
+        if not settings.TOKEN_CACHE['ENABLED']:
+            return super().authenticate_credentials(key)
+        token = local_tokens.get(key)
+        count_cache('token_local', token is not None, token is None)
+        if token is None:
+            token = cache.get(CACHE_PREFIX + key)
+            count_cache('token', token is not None, token is None)
+            if token is None:
+                _, token = super().authenticate_credentials(key)
+                cache.set(CACHE_PREFIX + key, token,
+                          settings.TOKEN_CACHE['TIMEOUT'])
+            local_tokens.set(key, token)
+        if not token.user.is_active:
+            raise exceptions.AuthenticationFailed('User inactive or deleted.')
+        return token.user, token
@@ -0,0 +1,144 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from rest_framework.response import Response
+
+from .compression import precompress
+from .metrics import count_cache
+
+CONTENT_VERSION_KEY = 'content_version'
+# Bumped on any recipe change; only whole cached list pages depend on it.
+LISTING_VERSION_KEY = 'listing_version'
+
+
+class LRUCache:
+
+    def __init__(self, max_size, timeout):
+        self.max_size = max_size
+        self.timeout = timeout
+        self.data = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self.lock:
+            item = self.data.get(key)
+            if item is None:
+                return default
+            value, expires = item
+            if expires < time.monotonic():
+                del self.data[key]
+                return default
+            self.data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self.lock:
+            self.data[key] = (value, time.monotonic() + self.timeout)
+            self.data.move_to_end(key)
+            while len(self.data) > self.max_size:
+                self.data.popitem(last=False)
+
+    def delete(self, key):
+        with self.lock:
+            self.data.pop(key, None)
+
+    def clear(self):
+        with self.lock:
+            self.data.clear()
+
+
+def get_version(key):
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, time.time_ns(), None)
+        version = cache.get(key)
+    return version
+
+
+def bump_version(key):
+    try:
+        return cache.incr(key)
+    except ValueError:
+        return get_version(key)
+
+
+def get_content_version():
+    return get_version(CONTENT_VERSION_KEY)
+
+
+def bump_content_version():
+    return bump_version(CONTENT_VERSION_KEY)
+
+
+def bump_listing_version():
+    return bump_version(LISTING_VERSION_KEY)
+
+
+def user_lists_version_key(user_id):
+    # Bumped when the user's favorites or shopping cart change.
+    return f'user_lists_version:{user_id}'
+
+
+def recipe_key(recipe_id, version):
+    return f'recipe:{version}:{recipe_id}'
+
+
+def invalidate_recipes(recipe_ids):
+    version = get_content_version()
+    cache.delete_many([recipe_key(pk, version) for pk in recipe_ids])
+
+
+def response_entry(response):
+    return {
+        'content': response.content,
+        'content_type': response['Content-Type'],
+        'encodings': precompress(response.content, response['Content-Type']),
+    }
+
+
+def cached_response(entry):
+    response = HttpResponse(entry['content'],
+                            content_type=entry['content_type'])
+    response.precompressed = entry['encodings']
+    return response
+
+
+class CachedListMixin:
+    # Whole rendered list bodies are cached per version of the data they
+    # depend on, together with their compressed variants, so neither the
+    # rendering nor the compression is repeated for identical requests.
+    cache_versions = (CONTENT_VERSION_KEY,)
+
+    def is_cacheable(self, request):
+        return request.accepted_renderer.format != 'api'
+
+    def list(self, request, *args, **kwargs):
+        self.response_cache_key = None
+        if self.is_cacheable(request):
+            versions = ':'.join(
+                str(get_version(key)) for key in self.cache_versions)
+            self.response_cache_key = (
+                f'response:{versions}:{request.accepted_media_type}:'
+                f'{request.build_absolute_uri()}')
+            entry = cache.get(self.response_cache_key)
+            count_cache('response', entry is not None, entry is None)
+            if entry is not None:
+                return cached_response(entry)
+        return super().list(request, *args, **kwargs)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(
+            request, response, *args, **kwargs)
+        if (getattr(self, 'response_cache_key', None)
+                and isinstance(response, Response)
+                and response.status_code == 200):
+            response.render()
+            entry = response_entry(response)
+            cache.set(self.response_cache_key, entry,
+                      settings.RESPONSE_CACHE_TIMEOUT)
+            response.precompressed = entry['encodings']
+        return response
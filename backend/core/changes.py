@@ -0,0 +1,36 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection
+from django.utils import timezone
+
+# Transactions that have written something and are still open. Rows of other
+# database roles show no xact_start unless the role has pg_read_all_stats,
+# so the app has to connect as a single role.
+OLDEST_TRANSACTION_SQL = '''
+    SELECT min(xact_start) FROM pg_stat_activity
+    WHERE datname = current_database() AND backend_xid IS NOT NULL
+    AND pid <> pg_backend_pid()
+'''
+
+
+def oldest_transaction():
+    if connection.vendor != 'postgresql':
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute(OLDEST_TRANSACTION_SQL)
+        return cursor.fetchone()[0]
+
+
+def settled_before():
+    # ChangeLog ids are taken at insert but become visible at commit, so a
+    # reader can see id 12 while id 11 is still uncommitted. Only entries
+    # created before every running transaction started, minus CHANGES['SETTLE']
+    # seconds for clock skew and for databases where running transactions
+    # can't be listed, are served; a cursor never moves past an id that may
+    # still appear.
+    cutoff = timezone.now()
+    oldest = oldest_transaction()
+    if oldest is not None:
+        cutoff = min(cutoff, oldest)
+    return cutoff - timedelta(seconds=settings.CHANGES['SETTLE'])
@@ -0,0 +1,32 @@
+from django.conf import settings
+from django.core.checks import Error, Warning, register
+
+# Each process gets a private copy of this backend.
+LOCAL_CACHE = 'django.core.cache.backends.locmem.LocMemCache'
+
+
+@register()
+def token_cache_check(app_configs, **kwargs):
+    if (settings.TOKEN_CACHE['ENABLED']
+            and settings.CACHES['default']['BACKEND'] == LOCAL_CACHE):
+        return [Error(
+            'TOKEN_CACHE is enabled with a per-process cache backend.',
+            hint='A revoked token or deactivated user stays valid in the '
+                 'other workers for TOKEN_CACHE["TIMEOUT"] seconds. Set '
+                 'CACHE_BACKEND to Memcached or Redis, or turn '
+                 'TOKEN_CACHE_ENABLED off.',
+            id='core.E001')]
+    return []
+
+
+@register(deploy=True)
+def shared_cache_check(app_configs, **kwargs):
+    if settings.CACHES['default']['BACKEND'] == LOCAL_CACHE:
+        return [Warning(
+            'The default cache is not shared between processes.',
+            hint='Cache versions and the ingredient index journal only '
+                 'reach the worker that bumped them, so other workers serve '
+                 'stale pages and search results. Set CACHE_BACKEND to '
+                 'Memcached or Redis.',
+            id='core.W001')]
+    return []
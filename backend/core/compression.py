@@ -0,0 +1,74 @@
+import gzip
+
+import brotli
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+from django.utils.deprecation import MiddlewareMixin
+
+COMPRESSORS = {
+    'br': lambda content: brotli.compress(
+        content, quality=settings.COMPRESSION['BROTLI_QUALITY']),
+    'gzip': lambda content: gzip.compress(
+        content, compresslevel=settings.COMPRESSION['GZIP_LEVEL'], mtime=0),
+}
+
+
+def is_compressible(content, content_type):
+    media_type = content_type.split(';')[0].strip()
+    return (len(content) >= settings.COMPRESSION['MIN_SIZE']
+            and media_type in settings.COMPRESSION['CONTENT_TYPES'])
+
+
+def precompress(content, content_type):
+    if not is_compressible(content, content_type):
+        return {}
+    return {encoding: compress(content)
+            for encoding, compress in COMPRESSORS.items()}
+
+
+def choose_encoding(accept_encoding):
+    accepted = {}
+    for item in accept_encoding.split(','):
+        encoding, *params = item.strip().split(';')
+        quality = 1.0
+        for param in params:
+            name, _, value = param.strip().partition('=')
+            if name == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        accepted[encoding.strip().lower()] = quality
+    for encoding in COMPRESSORS:
+        if accepted.get(encoding, accepted.get('*', 0)) > 0:
+            return encoding
+    return None
+
+
+class CompressionMiddleware(MiddlewareMixin):
+    # Like GZipMiddleware, but prefers brotli, skips small bodies and
+    # non-text types, and reuses bodies compressed when they were cached.
+
+    def process_response(self, request, response):
+        if (response.streaming or response.has_header('Content-Encoding')
+                or not is_compressible(response.content,
+                                       response.get('Content-Type', ''))):
+            return response
+        patch_vary_headers(response, ('Accept-Encoding',))
+        encoding = choose_encoding(
+            request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        if encoding is None:
+            return response
+        precompressed = getattr(response, 'precompressed', {})
+        content = precompressed.get(encoding)
+        if content is None:
+            content = COMPRESSORS[encoding](response.content)
+        if len(content) >= len(response.content):
+            return response
+        response.content = content
+        response['Content-Length'] = str(len(content))
+        response['Content-Encoding'] = encoding
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response['ETag'] = 'W/' + etag
+        return response
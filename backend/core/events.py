@@ -0,0 +1,192 @@
+import asyncio
+import json
+import logging
+import secrets
+import select
+import threading
+from urllib.parse import parse_qs
+
+import psycopg2
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection, connections
+from rest_framework.exceptions import AuthenticationFailed
+from users.models import Follower
+
+from .authentication import CachedTokenAuthentication
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = 'foodgram_events'
+TICKET_PREFIX = 'events_ticket:'
+RECIPE_EVENTS = ('recipe_created', 'recipe_updated')
+
+
+class Broker:
+
+    def __init__(self):
+        self.subscribers = {}
+        self.lock = threading.Lock()
+        self.listener = None
+
+    def subscribe(self):
+        queue = asyncio.Queue(settings.EVENTS['QUEUE_SIZE'])
+        with self.lock:
+            self.subscribers[queue] = asyncio.get_running_loop()
+            if self.listener is None:
+                self.start_listener()
+        return queue
+
+    def start_listener(self):
+        if settings.EVENTS['BROKER'] != 'postgres':
+            # Subscribers only see events published by this very process,
+            # so changes made through foodgram.wsgi never reach them.
+            logger.warning(
+                "EVENTS['BROKER'] is %r: only events published by this "
+                "process are delivered", settings.EVENTS['BROKER'])
+            self.listener = False
+            return
+        self.listener = threading.Thread(target=self.listen, daemon=True)
+        self.listener.start()
+
+    def unsubscribe(self, queue):
+        with self.lock:
+            self.subscribers.pop(queue, None)
+
+    def publish(self, event):
+        if settings.EVENTS['BROKER'] == 'postgres':
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT pg_notify(%s, %s)',
+                               [CHANNEL, json.dumps(event)])
+        else:
+            self.dispatch(event)
+
+    def dispatch(self, event):
+        with self.lock:
+            subscribers = list(self.subscribers.items())
+        for queue, loop in subscribers:
+            loop.call_soon_threadsafe(self.put, queue, event)
+
+    @staticmethod
+    def put(queue, event):
+        if not queue.full():
+            queue.put_nowait(event)
+
+    def listen(self):
+        params = connections['default'].get_connection_params()
+        while True:
+            try:
+                listener = psycopg2.connect(**params)
+                listener.autocommit = True
+                listener.cursor().execute(f'LISTEN {CHANNEL}')
+                while True:
+                    select.select([listener], [], [], 5)
+                    listener.poll()
+                    while listener.notifies:
+                        notify = listener.notifies.pop(0)
+                        self.dispatch(json.loads(notify.payload))
+            except psycopg2.Error:
+                logger.exception('Event listener failed, reconnecting')
+                threading.Event().wait(5)
+
+
+broker = Broker()
+
+
+def issue_ticket(user):
+    # Browsers can't set headers on an EventSource, and a token in the URL
+    # ends up in access logs, so they get a short-lived single-use ticket.
+    ticket = secrets.token_urlsafe(32)
+    cache.set(TICKET_PREFIX + ticket, user.pk, settings.EVENTS['TICKET_TTL'])
+    return ticket
+
+
+def redeem_ticket(ticket):
+    # Only the caller whose delete removed the key gets the user.
+    user_id = cache.get(TICKET_PREFIX + ticket)
+    if user_id is None or not cache.delete(TICKET_PREFIX + ticket):
+        return None
+    return get_user_model().objects.filter(
+        pk=user_id, is_active=True).first()
+
+
+def get_user(scope):
+    for name, value in scope['headers']:
+        if name == b'authorization' and value.startswith(b'Token '):
+            token = value[len(b'Token '):].decode()
+            try:
+                return CachedTokenAuthentication().authenticate_credentials(
+                    token)[0]
+            except AuthenticationFailed:
+                return None
+    ticket = parse_qs(scope['query_string'].decode()).get('ticket', [''])[0]
+    return redeem_ticket(ticket) if ticket else None
+
+
+def authenticate(scope):
+    user = get_user(scope)
+    if user is None:
+        return None, None
+    following = set(Follower.objects.filter(
+        user=user).values_list('author_id', flat=True))
+    return user, following
+
+
+def relevant(event, user_id, following):
+    if event['type'] in RECIPE_EVENTS:
+        return event['author'] in following
+    if event['user'] == user_id:
+        if event['type'] == 'followed':
+            following.add(event['author'])
+        else:
+            following.discard(event['author'])
+        return True
+    return event['author'] == user_id and event['type'] == 'followed'
+
+
+async def wait_disconnect(receive):
+    while (await receive())['type'] != 'http.disconnect':
+        pass
+
+
+async def events_application(scope, receive, send):
+    user, following = await sync_to_async(authenticate)(scope)
+    if user is None:
+        await send({'type': 'http.response.start', 'status': 401,
+                    'headers': [(b'content-type', b'text/plain')]})
+        await send({'type': 'http.response.body', 'body': b'Unauthorized'})
+        return
+    queue = broker.subscribe()
+    await send({'type': 'http.response.start', 'status': 200, 'headers': [
+        (b'content-type', b'text/event-stream'),
+        (b'cache-control', b'no-cache'),
+        (b'x-accel-buffering', b'no'),
+    ]})
+    await send({'type': 'http.response.body', 'body': b': connected\n\n',
+                'more_body': True})
+    disconnect = asyncio.ensure_future(wait_disconnect(receive))
+    try:
+        while True:
+            event = asyncio.ensure_future(queue.get())
+            done, _ = await asyncio.wait(
+                {event, disconnect}, timeout=settings.EVENTS['KEEPALIVE'],
+                return_when=asyncio.FIRST_COMPLETED)
+            if event not in done:
+                event.cancel()
+            if disconnect in done:
+                break
+            if event not in done:
+                body = b': keepalive\n\n'
+            elif relevant(event.result(), user.id, following):
+                data = json.dumps(event.result())
+                body = f'event: {event.result()["type"]}\ndata: {data}\n\n'
+                body = body.encode()
+            else:
+                continue
+            await send({'type': 'http.response.body', 'body': body,
+                        'more_body': True})
+    finally:
+        broker.unsubscribe(queue)
+        disconnect.cancel()
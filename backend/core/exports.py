@@ -0,0 +1,97 @@
+import hashlib
+import io
+import json
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import transaction
+from django.db.models import F, Sum
+from django.utils import timezone
+from food_recipies.models import QuantityOfIngredients, ShoppingListExport
+
+from .pdf import render_pdf
+
+logger = logging.getLogger(__name__)
+
+
+def cart_ingredients(user):
+    return list(QuantityOfIngredients.objects.filter(
+        recipe__carts__user=user
+    ).values(
+        'ingredient__name', 'ingredient__measurement_unit'
+    ).order_by(
+        'ingredient__name'
+    ).annotate(ingredient_amount=Sum('amount')))
+
+
+def enqueue(user):
+    # The version is a digest of exactly what the PDF will show, so repeated
+    # requests for an unchanged cart end up on the same job.
+    ingredients = cart_ingredients(user)
+    version = hashlib.blake2b(
+        json.dumps(ingredients, sort_keys=True).encode(), digest_size=16
+    ).hexdigest()
+    job, created = ShoppingListExport.objects.get_or_create(
+        user=user, version=version, defaults={'ingredients': ingredients})
+    if job.status == ShoppingListExport.FAILED:
+        ShoppingListExport.objects.filter(pk=job.pk).update(
+            status=ShoppingListExport.PENDING, attempts=0, error='')
+        job.refresh_from_db()
+    return job
+
+
+def requeue_stale():
+    # claim() has already counted the attempt that stalled, so a job that
+    # keeps killing its worker fails after RETRIES like any other error.
+    now = timezone.now()
+    retries = settings.SHOPPING_LIST_EXPORTS['RETRIES']
+    stale = ShoppingListExport.objects.filter(
+        status=ShoppingListExport.RUNNING,
+        updated__lt=now - timedelta(
+            seconds=settings.SHOPPING_LIST_EXPORTS['STALE_AFTER']))
+    stale.filter(attempts__gte=retries).update(
+        status=ShoppingListExport.FAILED, updated=now,
+        error='Worker stopped while rendering')
+    stale.filter(attempts__lt=retries).update(
+        status=ShoppingListExport.PENDING, updated=now)
+
+
+def claim():
+    with transaction.atomic():
+        job = ShoppingListExport.objects.select_for_update(
+            skip_locked=True
+        ).filter(status=ShoppingListExport.PENDING).first()
+        if job is None:
+            return None
+        job.status = ShoppingListExport.RUNNING
+        job.attempts = F('attempts') + 1
+        job.save(update_fields=['status', 'attempts', 'updated'])
+    job.refresh_from_db()
+    return job
+
+
+def render(job):
+    try:
+        buffer = io.BytesIO()
+        render_pdf(job.ingredients, buffer)
+        job.file.save(f'{job.user_id}-{job.version}.pdf',
+                      ContentFile(buffer.getvalue()), save=False)
+    except Exception as error:
+        logger.exception('Shopping list export %s failed', job.pk)
+        failed = job.attempts >= settings.SHOPPING_LIST_EXPORTS['RETRIES']
+        job.status = (ShoppingListExport.FAILED if failed
+                      else ShoppingListExport.PENDING)
+        job.error = str(error)
+        job.save(update_fields=['status', 'error', 'updated'])
+        return
+    job.status = ShoppingListExport.DONE
+    job.error = ''
+    job.save(update_fields=['status', 'error', 'file', 'updated'])
+    for old in ShoppingListExport.objects.filter(
+        user=job.user_id, id__lt=job.id,
+        status__in=[ShoppingListExport.DONE, ShoppingListExport.FAILED]
+    ):
+        old.file.delete(save=False)
+        old.delete()
@@ -0,0 +1,77 @@
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Case, Count, IntegerField, Q, Value, When
+from food_recipies.models import Recipies, Tags
+from rest_framework.validators import ValidationError
+
+from .cache import (CONTENT_VERSION_KEY, LISTING_VERSION_KEY, get_version,
+                    user_lists_version_key)
+from .filters import RecipeFilter
+from .metrics import count_cache
+
+PERSONAL_FILTERS = ('is_favorited', 'is_in_shopping_cart')
+
+
+def filtered_recipes(data, request):
+    filterset = RecipeFilter(data, Recipies.objects.all(), request=request)
+    if not filterset.is_valid():
+        raise ValidationError(filterset.errors)
+    return filterset.qs.order_by().values('pk')
+
+
+def tag_counts(data, request):
+    # A tag's count ignores the selected tags: tags are OR-ed, so the chip
+    # shows how many recipes it matches together with the other conditions.
+    data = data.copy()
+    data.pop('tags', None)
+    recipes = filtered_recipes(data, request)
+    return list(Tags.objects.annotate(
+        count=Count('recipies', filter=Q(recipies__in=recipes))
+    ).values('id', 'name', 'color', 'slug', 'count'))
+
+
+def cooking_time_counts(data, request):
+    limits = settings.FACETS['COOKING_TIME_BUCKETS']
+    counts = dict(Recipies.objects.filter(
+        pk__in=filtered_recipes(data, request)
+    ).annotate(bucket=Case(
+        *[When(cooking_time__lte=limit, then=Value(index))
+          for index, limit in enumerate(limits)],
+        default=Value(len(limits)), output_field=IntegerField(),
+    )).order_by().values_list('bucket').annotate(count=Count('id')))
+    return [{
+        'min': limits[index - 1] + 1 if index else 1,
+        'max': limits[index] if index < len(limits) else None,
+        'count': counts.get(index, 0),
+    } for index in range(len(limits) + 1)]
+
+
+def facets_key(data, request):
+    versions = [CONTENT_VERSION_KEY, LISTING_VERSION_KEY]
+    user = None
+    if any(data.get(name) for name in PERSONAL_FILTERS):
+        user = request.user.id
+        versions.append(user_lists_version_key(user))
+    params = sorted((name, sorted(values)) for name, values in data.lists()
+                    if name != 'ordering')
+    digest = hashlib.blake2b(
+        json.dumps([user, params]).encode(), digest_size=16).hexdigest()
+    versions = ':'.join(str(get_version(key)) for key in versions)
+    return f'facets:{versions}:{digest}'
+
+
+def recipe_facets(request):
+    data = request.query_params
+    key = facets_key(data, request)
+    facets = cache.get(key)
+    count_cache('facets', facets is not None, facets is None)
+    if facets is None:
+        facets = {
+            'tags': tag_counts(data, request),
+            'cooking_time': cooking_time_counts(data, request),
+        }
+        cache.set(key, facets, settings.RESPONSE_CACHE_TIMEOUT)
+    return facets
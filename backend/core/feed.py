@@ -0,0 +1,99 @@
+from itertools import islice
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Q
+from food_recipies.models import Recipies, Timeline
+from users.models import Follower
+
+CELEBRITIES_KEY = 'feed:celebrities'
+CHUNK_SIZE = 1000
+
+
+def chunks(iterable):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, CHUNK_SIZE))
+        if not chunk:
+            return
+        yield chunk
+
+
+def is_celebrity(author_id):
+    return Follower.objects.filter(author_id=author_id).order_by(
+        'id')[settings.FEED['FANOUT_LIMIT']:].exists()
+
+
+def get_celebrities():
+    return cache.get_or_set(CELEBRITIES_KEY, lambda: set(
+        Follower.objects.values('author').annotate(
+            total=Count('id')
+        ).filter(
+            total__gt=settings.FEED['FANOUT_LIMIT']
+        ).values_list('author', flat=True)
+    ), settings.FEED['CELEBRITIES_TIMEOUT'])
+
+
+def trim_timeline(user_id):
+    # Walks timeline_user_date past TIMELINE_SIZE rows and deletes exactly
+    # those; id breaks pub_date ties, so rows inside the cap are kept.
+    size = settings.FEED['TIMELINE_SIZE']
+    extra = list(Timeline.objects.filter(user_id=user_id).order_by(
+        '-pub_date', '-id').values_list('id', flat=True)[size:])
+    if extra:
+        Timeline.objects.filter(id__in=extra).delete()
+
+
+def trim():
+    # Run by `manage.py trimtimelines`; fan-out only inserts, so timelines
+    # may run past TIMELINE_SIZE until then.
+    users = list(Timeline.objects.order_by().values('user').annotate(
+        total=Count('id')
+    ).filter(
+        total__gt=settings.FEED['TIMELINE_SIZE']
+    ).values_list('user', flat=True))
+    for user_id in users:
+        trim_timeline(user_id)
+    return len(users)
+
+
+def fan_out(recipe):
+    if is_celebrity(recipe.author_id):
+        return
+    followers = Follower.objects.filter(
+        author_id=recipe.author_id
+    ).values_list('user_id', flat=True).iterator(chunk_size=CHUNK_SIZE)
+    for user_ids in chunks(followers):
+        Timeline.objects.bulk_create((
+            Timeline(user_id=user_id, recipe_id=recipe.id,
+                     pub_date=recipe.pub_date)
+            for user_id in user_ids
+        ), ignore_conflicts=True)
+
+
+def backfill(user_id, author_id):
+    if is_celebrity(author_id):
+        return
+    recipes = Recipies.objects.filter(author_id=author_id).order_by(
+        '-pub_date'
+    ).values_list('id', 'pub_date')[:settings.FEED['TIMELINE_SIZE']]
+    Timeline.objects.bulk_create((
+        Timeline(user_id=user_id, recipe_id=recipe_id, pub_date=pub_date)
+        for recipe_id, pub_date in recipes
+    ), ignore_conflicts=True)
+    trim_timeline(user_id)
+
+
+def purge(user_id, author_id):
+    Timeline.objects.filter(
+        user_id=user_id, recipe__author_id=author_id).delete()
+
+
+def timeline_recipes(user):
+    condition = Q(id__in=Timeline.objects.filter(
+        user=user).values('recipe_id'))
+    celebrities = get_celebrities()
+    if celebrities:
+        condition |= Q(author__in=Follower.objects.filter(
+            user=user, author__in=celebrities).values('author'))
+    return Recipies.objects.filter(condition).order_by('-pub_date')
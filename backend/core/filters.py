@@ -1,10 +1,26 @@
 from django.contrib.auth import get_user_model
+from django_filters.constants import EMPTY_VALUES
 from django_filters.rest_framework import FilterSet, filters
 from food_recipies.models import Recipies, Tags
+from rest_framework.validators import ValidationError
 
 User = get_user_model()
 
 
+class IndexedOrderingFilter(filters.OrderingFilter):
+    # A single sort key plus the id tie-breaker in the same direction, which
+    # is exactly what the indexes on Recipies can serve without a sort.
+
+    def filter(self, qs, value):
+        if value in EMPTY_VALUES:
+            return qs
+        if len(value) > 1:
+            raise ValidationError({'ordering': 'Only one field is allowed'})
+        ordering = self.get_ordering_value(value[0])
+        return qs.order_by(
+            ordering, '-id' if ordering.startswith('-') else 'id')
+
+
 class RecipeFilter(FilterSet):
     author = filters.ModelChoiceFilter(queryset=User.objects.all())
     tags = filters.ModelMultipleChoiceFilter(
@@ -16,17 +32,22 @@ class RecipeFilter(FilterSet):
     is_in_shopping_cart = filters.BooleanFilter(
             method='get_is_in_shopping_cart'
     )
+    cooking_time = filters.RangeFilter()
+    ordering = IndexedOrderingFilter(
+            fields=('pub_date', 'cooking_time', 'favorites_count', 'name')
+    )
 
     class Meta:
         model = Recipies
-        fields = ('tags', 'author', 'is_favorited', 'is_in_shopping_cart')
+        fields = ('tags', 'author', 'is_favorited', 'is_in_shopping_cart',
+                  'cooking_time')
 
-    def get_is_favorited(self, queryset, value):
+    def get_is_favorited(self, queryset, name, value):
         if value:
             return queryset.filter(favorites__user=self.request.user)
         return queryset
 
-    def get_is_in_shopping_cart(self, queryset, value):
+    def get_is_in_shopping_cart(self, queryset, name, value):
         if value:
             return queryset.filter(carts__user=self.request.user)
         return queryset
@@ -0,0 +1,158 @@
+import itertools
+import os
+import threading
+
+import numpy as np
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from food_recipies.models import Favorites
+from users.models import Follower
+
+from .metrics import count_cache
+
+User = get_user_model()
+
+CHUNK_SIZE = 10000
+# Every relation is stored in compressed sparse row form: the neighbours of
+# node i are indices[indptr[i]:indptr[i + 1]]. Users are addressed by their
+# position in the sorted `users` array, recipes by position in `recipes`.
+ARRAYS = ('users', 'recipes', 'follows_indptr', 'follows',
+          'favorites_indptr', 'favorites', 'fans_indptr', 'fans')
+
+
+def edges(queryset):
+    flat = np.fromiter(itertools.chain.from_iterable(
+        queryset.order_by().iterator(chunk_size=CHUNK_SIZE)), dtype=np.int64)
+    return flat[0::2], flat[1::2]
+
+
+def csr(rows, columns, size):
+    indptr = np.zeros(size + 1, dtype=np.int64)
+    np.cumsum(np.bincount(rows, minlength=size), out=indptr[1:])
+    return indptr, columns[np.argsort(rows, kind='stable')].astype(np.int32)
+
+
+def build():
+    followers, authors = edges(Follower.objects.filter(
+        user__is_active=True, author__is_active=True
+    ).values_list('user_id', 'author_id'))
+    fans, recipes = edges(Favorites.objects.filter(
+        user__is_active=True, recipe__hidden=False
+    ).values_list('user_id', 'recipe_id'))
+    # Read after the edges, so every user they mention is in the array.
+    users = np.fromiter(User.objects.order_by('id').values_list(
+        'id', flat=True).iterator(chunk_size=CHUNK_SIZE), dtype=np.int64)
+    recipe_ids, recipes = np.unique(recipes, return_inverse=True)
+    followers = np.searchsorted(users, followers)
+    authors = np.searchsorted(users, authors)
+    fans = np.searchsorted(users, fans)
+    follows_indptr, follows = csr(followers, authors, len(users))
+    favorites_indptr, favorites = csr(fans, recipes, len(users))
+    fans_indptr, fans = csr(recipes, fans, len(recipe_ids))
+    return {
+        'users': users,
+        'recipes': recipe_ids,
+        'follows_indptr': follows_indptr,
+        'follows': follows,
+        'favorites_indptr': favorites_indptr,
+        'favorites': favorites,
+        'fans_indptr': fans_indptr,
+        'fans': fans,
+    }
+
+
+def save(arrays):
+    path = settings.FOLLOW_GRAPH['PATH']
+    with open(f'{path}.tmp', 'wb') as file:
+        np.savez(file, **arrays)
+    os.replace(f'{path}.tmp', path)
+
+
+def neighbours(indptr, indices, nodes):
+    # Neighbour lists of all nodes at once, each cut at MAX_DEGREE, plus the
+    # index into `nodes` every neighbour came from.
+    nodes = np.asarray(nodes, dtype=np.int64)
+    starts = indptr[nodes]
+    lengths = np.minimum(indptr[nodes + 1] - starts,
+                         settings.FOLLOW_GRAPH['MAX_DEGREE'])
+    ends = np.cumsum(lengths)
+    total = int(ends[-1]) if len(ends) else 0
+    offsets = np.arange(total) - np.repeat(ends - lengths - starts, lengths)
+    return indices[offsets], np.repeat(np.arange(len(nodes)), lengths)
+
+
+class FollowGraph:
+
+    def __init__(self, arrays, version):
+        for name in ARRAYS:
+            setattr(self, name, arrays[name])
+        self.version = version
+
+    def suggest(self, user_id, limit):
+        # Walks two hops: the user's follows and the users sharing favorited
+        # recipes with them (weighted by how many they share), then whom
+        # those follow. Authors already followed are dropped.
+        size = len(self.users)
+        position = np.searchsorted(self.users, user_id)
+        if position == size or self.users[position] != user_id:
+            return []
+        followed, _ = neighbours(
+            self.follows_indptr, self.follows, [position])
+        recipes, _ = neighbours(
+            self.favorites_indptr, self.favorites, [position])
+        fans, _ = neighbours(self.fans_indptr, self.fans, recipes)
+        weights = settings.FOLLOW_GRAPH['FAVORITE_WEIGHT'] * np.bincount(
+            fans, minlength=size)
+        weights[followed] += 1
+        weights[position] = 0
+        sources = np.flatnonzero(weights)
+        candidates, origins = neighbours(
+            self.follows_indptr, self.follows, sources)
+        scores = np.bincount(candidates, weights=weights[sources][origins],
+                             minlength=size)
+        scores[position] = 0
+        scores[followed] = 0
+        top = np.flatnonzero(scores)
+        if len(top) > limit:
+            top = top[np.argpartition(-scores[top], limit)[:limit]]
+        top = top[np.lexsort((self.users[top], -scores[top]))]
+        return list(zip(self.users[top].tolist(),
+                        scores[top].round(2).tolist()))
+
+
+class FollowGraphLoader:
+    # Each process keeps the last graph written by `manage.py
+    # buildfollowgraph` and reloads it when the file's mtime changes.
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.graph = None
+
+    def get(self):
+        try:
+            version = os.stat(settings.FOLLOW_GRAPH['PATH']).st_mtime_ns
+        except FileNotFoundError:
+            return None
+        with self.lock:
+            if self.graph is None or self.graph.version != version:
+                with np.load(settings.FOLLOW_GRAPH['PATH']) as data:
+                    self.graph = FollowGraph(data, version)
+            return self.graph
+
+
+follow_graph = FollowGraphLoader()
+
+
+def follow_suggestions(user_id):
+    graph = follow_graph.get()
+    if graph is None:
+        return []
+    key = f'follow_suggestions:{graph.version}:{user_id}'
+    suggestions = cache.get(key)
+    count_cache('follow_suggestions', suggestions is not None,
+                suggestions is None)
+    if suggestions is None:
+        suggestions = graph.suggest(user_id, settings.FOLLOW_GRAPH['LIMIT'])
+        cache.set(key, suggestions, settings.FOLLOW_GRAPH['CACHE_TIMEOUT'])
+    return suggestions
@@ -0,0 +1,107 @@
+import functools
+import hashlib
+import json
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.utils import timezone
+from food_recipies.models import IdempotencyKey
+from rest_framework import status
+from rest_framework.response import Response
+from rest_framework.validators import ValidationError
+
+HEADER = 'Idempotency-Key'
+
+
+def request_fingerprint(request):
+    # request.data is only parsed here, not validated, so a base64 image is
+    # hashed as text and not decoded.
+    body = json.dumps(request.data, sort_keys=True, default=str)
+    return hashlib.blake2b(
+        f'{request.method} {request.path}\n{body}'.encode(), digest_size=16
+    ).hexdigest()
+
+
+def expired():
+    now = timezone.now()
+    ttl = timedelta(seconds=settings.IDEMPOTENCY['TTL'])
+    lock_timeout = timedelta(seconds=settings.IDEMPOTENCY['LOCK_TIMEOUT'])
+    return (Q(created__lt=now - ttl)
+            | Q(status_code=None, created__lt=now - lock_timeout))
+
+
+def expire():
+    # Run by `manage.py expireidempotencykeys`; claim only clears the one
+    # key it is about to take.
+    return IdempotencyKey.objects.filter(expired()).delete()[0]
+
+
+def claim(user, key, fingerprint):
+    # An expired key, or one left behind by a worker that died mid-request,
+    # is dropped first; whoever inserts the row then does the work.
+    IdempotencyKey.objects.filter(expired(), user=user, key=key).delete()
+    try:
+        # A savepoint, so a duplicate doesn't break an enclosing transaction.
+        with transaction.atomic():
+            return IdempotencyKey.objects.create(
+                user=user, key=key, fingerprint=fingerprint), True
+    except IntegrityError:
+        return IdempotencyKey.objects.filter(user=user, key=key).first(), False
+
+
+def replay(entry, fingerprint):
+    if entry.fingerprint != fingerprint:
+        return Response(
+            {'detail': f'{HEADER} was already used for another request'},
+            status=status.HTTP_422_UNPROCESSABLE_ENTITY)
+    if entry.status_code is None:
+        # Answered at once: waiting here would hold a worker per retry.
+        return Response(
+            {'detail': f'A request with this {HEADER} is still running'},
+            status=status.HTTP_409_CONFLICT, headers={'Retry-After': '1'})
+    response = Response(entry.response, status=entry.status_code)
+    response['Idempotent-Replayed'] = 'true'
+    return response
+
+
+def idempotent(handler):
+    # A POST repeated with the same Idempotency-Key gets the stored response
+    # of the first one for IDEMPOTENCY['TTL'] seconds. Duplicates arriving
+    # while the first is running get 409. Only successful responses are
+    # stored: on any 4xx or 5xx, returned or raised, the key is released and
+    # the request can be retried with it.
+
+    @functools.wraps(handler)
+    def wrapper(view, request, *args, **kwargs):
+        key = request.headers.get(HEADER)
+        if (not key or request.method != 'POST'
+                or not request.user.is_authenticated):
+            return handler(view, request, *args, **kwargs)
+        if len(key) > IdempotencyKey._meta.get_field('key').max_length:
+            raise ValidationError({HEADER: 'Key is too long'})
+        fingerprint = request_fingerprint(request)
+        while True:
+            entry, created = claim(request.user, key, fingerprint)
+            if created:
+                break
+            if entry is not None:
+                return replay(entry, fingerprint)
+            # The first request failed and released the key.
+        try:
+            response = handler(view, request, *args, **kwargs)
+        except Exception:
+            entry.delete()
+            raise
+        if (not isinstance(response, Response)
+                or status.is_client_error(response.status_code)
+                or status.is_server_error(response.status_code)):
+            entry.delete()
+            return response
+        entry.status_code = response.status_code
+        entry.response = response.data
+        entry.save(update_fields=['status_code', 'response'])
+        return response
+
+    return wrapper
@@ -0,0 +1,115 @@
+import threading
+from array import array
+from collections import defaultdict
+
+import numpy as np
+from django.core.cache import cache
+from food_recipies.models import QuantityOfIngredients
+
+SEQUENCE_KEY = 'ingredient_index:sequence'
+CHANGE_KEY = 'ingredient_index:change:{}'
+CHANGE_TIMEOUT = 60 * 60
+
+
+class IngredientIndex:
+    # Postings map ingredient id -> positions of recipes using it; a changed
+    # recipe gets a new position and its old one is tombstoned (size 0).
+    # Other processes learn about changes through a journal in the cache.
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.built = False
+
+    def build(self):
+        recipe_ids = array('q')
+        sizes = array('h')
+        positions = {}
+        postings = defaultdict(lambda: array('i'))
+        pairs = QuantityOfIngredients.objects.filter(
+            recipe__hidden=False
+        ).values_list(
+            'recipe_id', 'ingredient_id'
+        ).order_by('recipe_id').distinct().iterator(chunk_size=10000)
+        sequence = cache.get(SEQUENCE_KEY, 0)
+        for recipe_id, ingredient_id in pairs:
+            position = positions.get(recipe_id)
+            if position is None:
+                position = positions[recipe_id] = len(recipe_ids)
+                recipe_ids.append(recipe_id)
+                sizes.append(0)
+            postings[ingredient_id].append(position)
+            sizes[position] += 1
+        with self.lock:
+            self.recipe_ids = recipe_ids
+            self.sizes = sizes
+            self.positions = positions
+            self.postings = postings
+            self.tombstones = 0
+            self.sequence = sequence
+            self.built = True
+
+    def notify(self, recipe_id):
+        try:
+            sequence = cache.incr(SEQUENCE_KEY)
+        except ValueError:
+            cache.add(SEQUENCE_KEY, 0, None)
+            sequence = cache.incr(SEQUENCE_KEY)
+        cache.set(CHANGE_KEY.format(sequence), recipe_id, CHANGE_TIMEOUT)
+
+    def sync(self):
+        if not self.built:
+            return self.build()
+        sequence = cache.get(SEQUENCE_KEY, 0)
+        if sequence == self.sequence:
+            return
+        if sequence < self.sequence:
+            return self.build()
+        keys = [CHANGE_KEY.format(number)
+                for number in range(self.sequence + 1, sequence + 1)]
+        changes = cache.get_many(keys)
+        if (len(changes) < len(keys)
+                or self.tombstones > len(self.recipe_ids) // 4):
+            return self.build()
+        recipe_ids = set(changes.values())
+        ingredients = defaultdict(set)
+        for recipe_id, ingredient_id in QuantityOfIngredients.objects.filter(
+            recipe_id__in=recipe_ids, recipe__hidden=False
+        ).values_list('recipe_id', 'ingredient_id'):
+            ingredients[recipe_id].add(ingredient_id)
+        with self.lock:
+            for recipe_id in recipe_ids:
+                self.replace(recipe_id, ingredients[recipe_id])
+            self.sequence = sequence
+
+    def replace(self, recipe_id, ingredient_ids):
+        position = self.positions.pop(recipe_id, None)
+        if position is not None:
+            self.sizes[position] = 0
+            self.tombstones += 1
+        if not ingredient_ids:
+            return
+        position = self.positions[recipe_id] = len(self.recipe_ids)
+        self.recipe_ids.append(recipe_id)
+        self.sizes.append(len(ingredient_ids))
+        for ingredient_id in ingredient_ids:
+            self.postings[ingredient_id].append(position)
+
+    def search(self, ingredient_ids, max_missing, limit):
+        self.sync()
+        with self.lock:
+            sizes = np.array(self.sizes, dtype=np.int16)
+            counts = np.zeros(len(sizes), dtype=np.int16)
+            for ingredient_id in set(ingredient_ids):
+                posting = self.postings.get(ingredient_id)
+                if posting:
+                    counts[np.frombuffer(posting, dtype=np.int32)] += 1
+            missing = sizes - counts
+            found = np.flatnonzero(
+                (counts > 0) & (sizes > 0) & (missing <= max_missing))
+            found = found[np.lexsort((-counts[found], missing[found]))][:limit]
+            recipe_ids = np.frombuffer(
+                self.recipe_ids, dtype=np.int64)[found].tolist()
+        return list(zip(recipe_ids, missing[found].tolist()))
+
+
+ingredient_index = IngredientIndex()
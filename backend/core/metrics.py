@@ -0,0 +1,94 @@
+import os
+import socket
+import time
+
+from django.db import connection
+from django.http import HttpResponse
+from prometheus_client import (CONTENT_TYPE_LATEST, REGISTRY,
+                               CollectorRegistry, Counter, Gauge, Histogram,
+                               generate_latest, multiprocess)
+
+# With several gunicorn workers set PROMETHEUS_MULTIPROC_DIR to an empty
+# writable directory: every process then writes its samples to files there
+# and /metrics aggregates them.
+MULTIPROCESS = 'PROMETHEUS_MULTIPROC_DIR' in os.environ
+
+REQUEST_DURATION = Histogram(
+    'foodgram_request_duration_seconds', 'Request latency',
+    ['view', 'method', 'status'])
+REQUEST_QUERIES = Histogram(
+    'foodgram_request_db_queries', 'Database queries per request', ['view'],
+    buckets=(0, 1, 2, 3, 5, 10, 20, 50, 100, 250, float('inf')))
+REQUEST_DB_DURATION = Histogram(
+    'foodgram_request_db_duration_seconds', 'Database time per request',
+    ['view'])
+CACHE_REQUESTS = Counter(
+    'foodgram_cache_requests_total', 'Cache lookups', ['cache', 'result'])
+PDF_RENDER_DURATION = Histogram(
+    'foodgram_pdf_render_seconds', 'Shopping list PDF render time')
+WORKER = Gauge(
+    'foodgram_worker', 'Live worker processes', ['hostname', 'pid'],
+    multiprocess_mode='liveall')
+
+
+def view_name(request):
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return ''
+    view = getattr(match.func, 'cls', None)
+    if view is None:
+        return match.view_name or match.func.__name__
+    actions = getattr(match.func, 'actions', None)
+    if actions:
+        return f'{view.__name__}.{actions.get(request.method.lower(), "")}'
+    return view.__name__
+
+
+def count_cache(cache, hits, misses):
+    if hits:
+        CACHE_REQUESTS.labels(cache, 'hit').inc(hits)
+    if misses:
+        CACHE_REQUESTS.labels(cache, 'miss').inc(misses)
+
+
+def register_worker():
+    WORKER.labels(socket.gethostname(), str(os.getpid())).set(1)
+
+
+def metrics_view(request):
+    registry = REGISTRY
+    if MULTIPROCESS:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    return HttpResponse(generate_latest(registry),
+                        content_type=CONTENT_TYPE_LATEST)
+
+
+class MetricsMiddleware:
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        queries = [0, 0.0]
+
+        def record(execute, sql, params, many, context):
+            started = time.perf_counter()
+            try:
+                return execute(sql, params, many, context)
+            finally:
+                queries[0] += 1
+                queries[1] += time.perf_counter() - started
+
+        started = time.perf_counter()
+        with connection.execute_wrapper(record):
+            response = self.get_response(request)
+        # Unresolved paths share one label so scanners can't blow up the
+        # number of series.
+        view = view_name(request) or 'unmatched'
+        REQUEST_DURATION.labels(
+            view, request.method, response.status_code
+        ).observe(time.perf_counter() - started)
+        REQUEST_QUERIES.labels(view).observe(queries[0])
+        REQUEST_DB_DURATION.labels(view).observe(queries[1])
+        return response
@@ -4,17 +4,32 @@ from reportlab.pdfbase import pdfmetrics
 from reportlab.pdfbase.ttfonts import TTFont
 from reportlab.pdfgen import canvas
 
+from .metrics import PDF_RENDER_DURATION
+
+FONTS = {
+    'DejaVuSerif': 'core/fonts/DejaVuSerif.ttf',
+    'DejaVuSerif-Italic': 'core/fonts/DejaVuSerif-Italic.ttf',
+}
+
+
+def register_fonts():
+    registered = pdfmetrics.getRegisteredFontNames()
+    for name, path in FONTS.items():
+        if name not in registered:
+            pdfmetrics.registerFont(TTFont(name, settings.BASE_DIR / path))
+
 
 def getpdf(data):
-    pdfmetrics.registerFont(TTFont('DejaVuSerif',
-                                   settings.BASE_DIR /
-                                   'core/fonts/DejaVuSerif.ttf'))
-    pdfmetrics.registerFont(TTFont('DejaVuSerif-Italic',
-                                   settings.BASE_DIR /
-                                   'core/fonts/DejaVuSerif-Italic.ttf'))
     response = HttpResponse(content_type='application/pdf')
     response['Content-Disposition'] = 'attachment; filename="file.pdf"'
-    p = canvas.Canvas(response)
+    render_pdf(data, response)
+    return response
+
+
+@PDF_RENDER_DURATION.time()
+def render_pdf(data, file):
+    register_fonts()
+    p = canvas.Canvas(file)
     p.setFont('DejaVuSerif', 18)
     str_pos = 750
     p.drawString(50, str_pos, 'Ingredients:')
@@ -30,4 +45,3 @@ def getpdf(data):
     p.drawString(50, str_pos, 'Food')
     p.showPage()
     p.save()
-    return response
@@ -0,0 +1,159 @@
+import cProfile
+import io
+import marshal
+import pstats
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.db import connection
+from food_recipies.models import RequestProfile
+from rest_framework.exceptions import AuthenticationFailed
+
+from .authentication import CachedTokenAuthentication
+from .metrics import view_name
+
+
+def requested_mode(request):
+    mode = request.META.get('HTTP_X_PROFILE')
+    if mode is None and 'profile=' in request.META.get('QUERY_STRING', ''):
+        mode = request.GET.get('profile')
+    if not mode:
+        return None
+    if mode == RequestProfile.SAMPLING:
+        return RequestProfile.SAMPLING
+    return RequestProfile.DETERMINISTIC
+
+
+def staff_user(request):
+    user = getattr(request, 'user', None)
+    if user is None or not user.is_authenticated:
+        try:
+            user, _ = (CachedTokenAuthentication().authenticate(request)
+                       or (None, None))
+        except AuthenticationFailed:
+            return None
+    if user is not None and user.is_staff:
+        return user
+    return None
+
+
+class Sampler(threading.Thread):
+    # Polls the request thread's stack; the result is in the collapsed
+    # format flamegraph.pl and speedscope read.
+
+    def __init__(self, thread_id):
+        super().__init__(daemon=True)
+        self.thread_id = thread_id
+        self.stacks = Counter()
+        self.stopped = threading.Event()
+
+    def run(self):
+        while not self.stopped.wait(settings.PROFILER['INTERVAL']):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                stack.append(
+                    f'{frame.f_code.co_filename}:{frame.f_code.co_name}')
+                frame = frame.f_back
+            if stack:
+                self.stacks[';'.join(reversed(stack))] += 1
+
+    def stop(self):
+        self.stopped.set()
+        self.join()
+
+
+class ProfilerMiddleware:
+    # Only requests carrying the X-Profile header or ?profile= from a staff
+    # user are profiled; everything else costs one dict lookup.
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        mode = requested_mode(request)
+        if mode is None:
+            return self.get_response(request)
+        user = staff_user(request)
+        if user is None:
+            return self.get_response(request)
+        return self.profile(request, user, mode)
+
+    def profile(self, request, user, mode):
+        queries = defaultdict(lambda: [0, 0.0])
+
+        def record(execute, sql, params, many, context):
+            started = time.perf_counter()
+            try:
+                return execute(sql, params, many, context)
+            finally:
+                query = queries[sql]
+                query[0] += 1
+                query[1] += time.perf_counter() - started
+
+        with connection.execute_wrapper(record):
+            started = time.perf_counter()
+            if mode == RequestProfile.DETERMINISTIC:
+                response, summary, data = self.run_cprofile(request)
+            else:
+                response, summary, data = self.run_sampler(request)
+            duration = time.perf_counter() - started
+        top = sorted(queries.items(), key=lambda item: -item[1][1])
+        profile = RequestProfile.objects.create(
+            user=user,
+            method=request.method,
+            path=request.get_full_path()[:2000],
+            view=view_name(request),
+            status=response.status_code,
+            mode=mode,
+            duration=duration * 1000,
+            sql_count=sum(count for count, _ in queries.values()),
+            sql_time=sum(elapsed for _, elapsed in queries.values()) * 1000,
+            sql=[{'sql': sql, 'count': count, 'time': elapsed * 1000}
+                 for sql, (count, elapsed)
+                 in top[:settings.PROFILER['TOP']]],
+            summary=summary,
+            data=data,
+        )
+        keep = settings.PROFILER['KEEP']
+        stale = list(RequestProfile.objects.values_list(
+            'id', flat=True)[keep:keep + 1])
+        if stale:
+            RequestProfile.objects.filter(id__lte=stale[0]).delete()
+        response['X-Profile-Id'] = str(profile.id)
+        return response
+
+    def run_cprofile(self, request):
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            response = self.get_response(request)
+        finally:
+            profiler.disable()
+        summary = io.StringIO()
+        pstats.Stats(profiler, stream=summary).sort_stats(
+            'cumulative').print_stats(settings.PROFILER['TOP'])
+        profiler.create_stats()
+        return response, summary.getvalue(), marshal.dumps(profiler.stats)
+
+    def run_sampler(self, request):
+        sampler = Sampler(threading.get_ident())
+        sampler.start()
+        try:
+            response = self.get_response(request)
+        finally:
+            sampler.stop()
+        leaves = Counter()
+        for stack, count in sampler.stacks.items():
+            leaves[stack.rsplit(';', 1)[-1]] += count
+        total = sum(leaves.values())
+        summary = [f'{total} samples every '
+                   f'{settings.PROFILER["INTERVAL"] * 1000:g} ms']
+        summary.extend(f'{count:6d}  {leaf}' for leaf, count
+                       in leaves.most_common(settings.PROFILER['TOP']))
+        data = '\n'.join(f'{stack} {count}'
+                         for stack, count in sampler.stacks.items())
+        return response, '\n'.join(summary), data.encode()
@@ -0,0 +1,115 @@
+from django.contrib.auth import get_user_model
+from django.db import connection, models, transaction
+from django.db.models.deletion import get_candidate_relations_to_delete
+from food_recipies.models import PendingDeletion, Recipies
+from food_recipies.signals import recipes_hidden
+
+from .authentication import invalidate_user
+
+User = get_user_model()
+
+MODELS = {
+    PendingDeletion.RECIPE: Recipies,
+    PendingDeletion.USER: User,
+}
+
+
+def hide_recipes(recipe_ids):
+    recipe_ids = list(recipe_ids)
+    with transaction.atomic():
+        Recipies.objects.filter(pk__in=recipe_ids).update(hidden=True)
+        PendingDeletion.objects.bulk_create(
+            PendingDeletion(kind=PendingDeletion.RECIPE, object_id=pk)
+            for pk in recipe_ids
+        )
+        recipes_hidden.send(sender=Recipies, recipe_ids=recipe_ids)
+
+
+def hide_users(user_ids):
+    user_ids = list(user_ids)
+    with transaction.atomic():
+        User.objects.filter(pk__in=user_ids).update(is_active=False)
+        recipes = Recipies.objects.filter(author__in=user_ids)
+        recipe_ids = list(recipes.values_list('id', flat=True))
+        recipes.update(hidden=True)
+        PendingDeletion.objects.bulk_create(
+            PendingDeletion(kind=PendingDeletion.USER, object_id=pk)
+            for pk in user_ids
+        )
+        recipes_hidden.send(sender=Recipies, recipe_ids=recipe_ids)
+    for user in User.objects.filter(pk__in=user_ids):
+        invalidate_user(user)
+
+
+def delete_rows(model, pks):
+    table = connection.ops.quote_name(model._meta.db_table)
+    column = connection.ops.quote_name(model._meta.pk.column)
+    placeholders = ', '.join(['%s'] * len(pks))
+    file_fields = [field for field in model._meta.concrete_fields
+                  if isinstance(field, models.FileField)]
+    with transaction.atomic():
+        for field in file_fields:
+            names = [name for name in model._base_manager.filter(
+                pk__in=pks).values_list(field.attname, flat=True) if name]
+            transaction.on_commit(
+                lambda field=field, names=names: [
+                    field.storage.delete(name) for name in names])
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {table} WHERE {column} IN ({placeholders})',
+                pks)
+
+
+def purge(model, pks, batch_size, progress):
+    # Walks the same relations as Django's deletion collector, but deletes
+    # dependent rows bottom-up in small batches of raw DELETEs, each in its
+    # own transaction, without loading objects or sending signals.
+    for relation in get_candidate_relations_to_delete(model._meta):
+        related = relation.related_model
+        lookup = {f'{relation.field.name}__in': pks}
+        if relation.on_delete is models.DO_NOTHING:
+            continue
+        if relation.on_delete is models.SET_NULL:
+            related._base_manager.filter(**lookup).update(
+                **{relation.field.name: None})
+            continue
+        if relation.on_delete is not models.CASCADE:
+            raise ValueError(f'Cannot purge {related._meta.label} rows '
+                             f'referencing {model._meta.label}')
+        dependent = related._base_manager.filter(**lookup).values_list(
+            'pk', flat=True)
+        while True:
+            batch = list(dependent[:batch_size])
+            if not batch:
+                break
+            purge(related, batch, batch_size, progress)
+    delete_rows(model, pks)
+    progress(model, len(pks))
+
+
+def purge_pending(batch_size, progress):
+    purged = 0
+    for entry in PendingDeletion.objects.all():
+        purge(MODELS[entry.kind], [entry.object_id], batch_size, progress)
+        entry.delete()
+        purged += 1
+    return purged
+
+
+class DeferredDeleteAdminMixin:
+    # The admin confirmation page and delete itself would otherwise run the
+    # full deletion collector; the rows are hidden and queued instead.
+    hide_objects = None
+
+    def delete_model(self, request, obj):
+        self.hide_objects([obj.pk])
+
+    def delete_queryset(self, request, queryset):
+        self.hide_objects(queryset.values_list('pk', flat=True))
+
+    def get_deleted_objects(self, objs, request):
+        perms_needed = set()
+        if not self.has_delete_permission(request):
+            perms_needed.add(self.opts.verbose_name)
+        return ([str(obj) for obj in objs],
+                {self.opts.verbose_name_plural: len(objs)}, perms_needed, [])
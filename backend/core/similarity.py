@@ -0,0 +1,69 @@
+import hashlib
+
+import numpy as np
+from django.conf import settings
+from django.db.models import Q
+from food_recipies.models import RecipeBucket, RecipeSignature
+
+PRIME = (1 << 32) + 15
+PERMUTATIONS = settings.MINHASH['PERMUTATIONS']
+BANDS = settings.MINHASH['BANDS']
+ROWS = PERMUTATIONS // BANDS
+
+# Fixed seed: signatures must be identical in every process and deploy.
+A, B = np.random.default_rng(20230614).integers(
+    1, 1 << 32, size=(2, PERMUTATIONS, 1), dtype=np.uint64)
+
+
+def signature(ingredient_ids):
+    ids = np.fromiter(set(ingredient_ids), dtype=np.uint64)
+    return ((A * ids + B) % PRIME).min(axis=1).astype(np.uint32)
+
+
+def buckets(recipe_signature):
+    for band in range(BANDS):
+        rows = recipe_signature[band * ROWS:(band + 1) * ROWS].tobytes()
+        digest = hashlib.blake2b(rows, digest_size=8).digest()
+        yield band, int.from_bytes(digest, 'big', signed=True)
+
+
+def store_signatures(recipes):
+    RecipeSignature.objects.filter(recipe_id__in=recipes).delete()
+    RecipeBucket.objects.filter(recipe_id__in=recipes).delete()
+    signatures = []
+    recipe_buckets = []
+    for recipe_id, ingredient_ids in recipes.items():
+        if not ingredient_ids:
+            continue
+        recipe_signature = signature(ingredient_ids)
+        signatures.append(RecipeSignature(
+            recipe_id=recipe_id, signature=recipe_signature.tobytes()))
+        recipe_buckets.extend(
+            RecipeBucket(recipe_id=recipe_id, band=band, bucket=bucket)
+            for band, bucket in buckets(recipe_signature)
+        )
+    RecipeSignature.objects.bulk_create(signatures)
+    RecipeBucket.objects.bulk_create(recipe_buckets)
+
+
+def similar(recipe_id, limit):
+    own = RecipeSignature.objects.filter(
+        recipe_id=recipe_id).values_list('signature', flat=True).first()
+    if own is None:
+        return []
+    own = np.frombuffer(own, dtype=np.uint32)
+    condition = Q()
+    for band, bucket in buckets(own):
+        condition |= Q(band=band, bucket=bucket)
+    candidates = RecipeBucket.objects.filter(condition).exclude(
+        recipe_id=recipe_id
+    ).values('recipe_id').distinct()[:settings.MINHASH['MAX_CANDIDATES']]
+    scores = []
+    for candidate, other in RecipeSignature.objects.filter(
+        recipe_id__in=candidates
+    ).values_list('recipe_id', 'signature'):
+        other = np.frombuffer(other, dtype=np.uint32)
+        if len(other) == len(own):
+            scores.append((float((other == own).mean()), candidate))
+    scores.sort(reverse=True)
+    return scores[:limit]
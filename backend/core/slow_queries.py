@@ -0,0 +1,116 @@
+import hashlib
+import logging
+import random
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, connections
+from food_recipies.models import SlowQuery
+
+from .metrics import view_name
+
+logger = logging.getLogger(__name__)
+
+EXPLAIN = {
+    'postgresql': 'EXPLAIN (ANALYZE, BUFFERS) ',
+    'sqlite': 'EXPLAIN QUERY PLAN ',
+}
+PLACEHOLDERS = re.compile(r'%s(?:\s*,\s*%s)+')
+WHITESPACE = re.compile(r'\s+')
+# Reads that take row locks or call functions with side effects; running
+# them again under ANALYZE would block on, or repeat, the original work.
+SIDE_EFFECTS = re.compile(
+    r'\bFOR\s+(?:NO\s+KEY\s+)?UPDATE\b|\bFOR\s+(?:KEY\s+)?SHARE\b'
+    r'|\b(?:pg_notify|nextval|setval|pg_\w*advisory\w*)\s*\(',
+    re.IGNORECASE)
+
+executor = None
+executor_lock = threading.Lock()
+slots = threading.BoundedSemaphore(settings.SLOW_QUERIES['QUEUE_SIZE'])
+
+
+def normalize(sql):
+    return WHITESPACE.sub(' ', PLACEHOLDERS.sub('%s, ...', sql)).strip()
+
+
+def get_executor():
+    global executor
+    with executor_lock:
+        if executor is None:
+            executor = ThreadPoolExecutor(1, 'slow-queries')
+        return executor
+
+
+def should_explain(sql, fingerprint):
+    # ANALYZE runs the statement again, so only plain reads are explained,
+    # on a sample, and at most once per COOLDOWN for the same statement.
+    return (connection.vendor in EXPLAIN
+            and sql.lstrip()[:6].upper() == 'SELECT'
+            and not SIDE_EFFECTS.search(sql)
+            and random.random() < settings.SLOW_QUERIES['EXPLAIN_SAMPLE']
+            and cache.add(f'slow_query:{fingerprint}', True,
+                          settings.SLOW_QUERIES['COOLDOWN']))
+
+
+def explain(sql, params):
+    with connections['default'].cursor() as cursor:
+        cursor.execute(EXPLAIN[cursor.db.vendor] + sql, params)
+        return '\n'.join(
+            ' '.join(str(column) for column in row)
+            for row in cursor.fetchall())
+
+
+def store(sql, params, fingerprint, view, duration, analyze):
+    try:
+        plan = explain(sql, params) if analyze else ''
+        query = SlowQuery.objects.create(
+            fingerprint=fingerprint, sql=normalize(sql), view=view,
+            duration=duration, plan=plan)
+        keep = settings.SLOW_QUERIES['KEEP']
+        if query.id > keep:
+            SlowQuery.objects.filter(id__lte=query.id - keep).delete()
+    except Exception:
+        logger.exception('Could not store slow query')
+    finally:
+        connections['default'].close()
+        slots.release()
+
+
+def capture(sql, params, view, duration):
+    if not slots.acquire(blocking=False):
+        return
+    fingerprint = hashlib.blake2b(
+        normalize(sql).encode(), digest_size=16).hexdigest()
+    try:
+        get_executor().submit(
+            store, sql, params, fingerprint, view, duration,
+            should_explain(sql, fingerprint))
+    except RuntimeError:
+        slots.release()
+
+
+class SlowQueryMiddleware:
+    # Statements slower than SLOW_QUERIES['THRESHOLD'] ms are written, with
+    # their plan, from a background thread so the request isn't held up.
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+
+        def record(execute, sql, params, many, context):
+            started = time.perf_counter()
+            try:
+                return execute(sql, params, many, context)
+            finally:
+                duration = (time.perf_counter() - started) * 1000
+                if (duration >= settings.SLOW_QUERIES['THRESHOLD']
+                        and not many):
+                    capture(sql, params, view_name(request), duration)
+
+        with connection.execute_wrapper(record):
+            return self.get_response(request)
@@ -0,0 +1,227 @@
+import os
+import shutil
+from itertools import islice
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models import Prefetch
+from django.db.models.query import prefetch_related_objects
+from django.utils.dateparse import parse_datetime
+from food_recipies.models import (ChangeLog, Ingredients,
+                                  QuantityOfIngredients, Recipies, Tags)
+
+from .cache import bump_content_version, bump_listing_version
+from .ingredient_index import ingredient_index
+from .similarity import store_signatures
+
+User = get_user_model()
+
+AUTHOR_FIELDS = ('email', 'username', 'first_name', 'last_name')
+TAG_FIELDS = ('name', 'color', 'slug')
+
+
+def batches(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def recipe_batches(batch_size):
+    # iterator() streams from a server-side cursor and ignores
+    # prefetch_related, so relations are prefetched one batch at a time.
+    recipes = Recipies.objects.select_related('author').order_by(
+        'id').iterator(chunk_size=batch_size)
+    for batch in batches(recipes, batch_size):
+        prefetch_related_objects(
+            batch, 'tags', Prefetch(
+                'ingredient_in_recipe',
+                queryset=QuantityOfIngredients.objects.select_related(
+                    'ingredient').order_by('id')))
+        yield batch
+
+
+def recipe_record(recipe):
+    return {
+        'id': recipe.id,
+        'name': recipe.name,
+        'text': recipe.text,
+        'cooking_time': recipe.cooking_time,
+        'pub_date': recipe.pub_date,
+        'image': recipe.image.name,
+        'author': {field: getattr(recipe.author, field)
+                   for field in AUTHOR_FIELDS},
+        'tags': [{field: getattr(tag, field) for field in TAG_FIELDS}
+                 for tag in recipe.tags.all()],
+        'ingredients': [{
+            'name': amount.ingredient.name,
+            'measurement_unit': amount.ingredient.measurement_unit,
+            'amount': amount.amount,
+        } for amount in recipe.ingredient_in_recipe.all()],
+    }
+
+
+def image_path(directory, name):
+    path = os.path.abspath(os.path.join(directory, name))
+    if not path.startswith(os.path.join(os.path.abspath(directory), '')):
+        raise ValueError(f'Image path outside of {directory}: {name}')
+    return path
+
+
+# The two functions below run in worker processes and never touch the
+# database; they return None when the image is missing.
+
+def export_image(task):
+    directory, name = task
+    target = image_path(directory, name)
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    try:
+        with default_storage.open(name) as source, open(
+                target, 'wb') as file:
+            shutil.copyfileobj(source, file)
+    except FileNotFoundError:
+        return None
+    return name
+
+
+def import_image(task):
+    directory, name = task
+    try:
+        with open(image_path(directory, name), 'rb') as file:
+            return default_storage.save(name, File(file))
+    except FileNotFoundError:
+        return None
+
+
+def get_or_create_many(model, field, key, records):
+    # `records` maps key(row) -> fields of every row that has to exist.
+    # Missing ones are created, then all are read back because bulk_create
+    # only returns primary keys on PostgreSQL. Rows that conflict on another
+    # unique field are left out of the result.
+
+    def existing():
+        values = {fields[field] for fields in records.values()}
+        return {key(obj): obj for obj in model.objects.filter(
+            **{f'{field}__in': values})}
+
+    rows = existing()
+    missing = [model(**fields) for row_key, fields in records.items()
+               if row_key not in rows]
+    if missing:
+        model.objects.bulk_create(missing, ignore_conflicts=True)
+        rows = existing()
+    return rows
+
+
+def ingredient_key(ingredient):
+    if isinstance(ingredient, dict):
+        return ingredient['name'], ingredient['measurement_unit']
+    return ingredient.name, ingredient.measurement_unit
+
+
+def recipe_key(record):
+    return record['author']['email'], record['name']
+
+
+def import_batch(records, images, skip_existing=False):
+    # Recipes are matched on author email and name: ones already in the
+    # database are overwritten (or left alone with skip_existing), so a file
+    # can be imported again. Returns how many records were imported and how
+    # many were skipped as existing; the rest reference an author, tag or
+    # ingredient that clashes with a different existing row.
+    password = make_password(None)
+    authors = get_or_create_many(
+        User, 'email', lambda user: user.email,
+        {record['author']['email']: dict(record['author'], password=password)
+         for record in records})
+    tags = get_or_create_many(
+        Tags, 'slug', lambda tag: tag.slug,
+        {tag['slug']: tag for record in records for tag in record['tags']})
+    ingredients = get_or_create_many(
+        Ingredients, 'name', ingredient_key,
+        {ingredient_key(ingredient): {
+            'name': ingredient['name'],
+            'measurement_unit': ingredient['measurement_unit'],
+        } for record in records for ingredient in record['ingredients']})
+    accepted = [
+        (record, image) for record, image in zip(records, images)
+        if record['author']['email'] in authors
+        and all(tag['slug'] in tags for tag in record['tags'])
+        and all(ingredient_key(ingredient) in ingredients
+                for ingredient in record['ingredients'])
+    ]
+    # The last record wins when a file repeats a recipe.
+    imported = {recipe_key(record): (record, image)
+                for record, image in accepted}
+    through = Recipies.tags.through
+    with transaction.atomic():
+        existing = {
+            (recipe.author.email, recipe.name): recipe
+            for recipe in Recipies.objects.select_related('author').filter(
+                author__in={authors[email].id for email, _ in imported},
+                name__in={name for _, name in imported})
+            if (recipe.author.email, recipe.name) in imported}
+        skipped = []
+        if skip_existing:
+            skipped = [(record, image) for record, image in accepted
+                       if recipe_key(record) in existing]
+            for key in existing:
+                del imported[key]
+            existing = {}
+            # Images copied for the skipped recipes are not used.
+            transaction.on_commit(lambda: [
+                default_storage.delete(image) for record, image in skipped
+                if image is not None])
+        created = Recipies.objects.bulk_create(
+            Recipies(name=record['name'], text=record['text'],
+                     cooking_time=record['cooking_time'],
+                     image=image or record['image'],
+                     author=authors[record['author']['email']])
+            for key, (record, image) in imported.items()
+            if key not in existing)
+        created = iter(created)
+        recipes = [existing[key] if key in existing else next(created)
+                   for key in imported]
+        imported = list(imported.values())
+        # Existing recipes take the exported fields; pub_date is
+        # auto_now_add, so new ones get the original date afterwards.
+        for recipe, (record, image) in zip(recipes, imported):
+            recipe.text = record['text']
+            recipe.cooking_time = record['cooking_time']
+            recipe.image = image or record['image']
+            recipe.pub_date = parse_datetime(record['pub_date'])
+        Recipies.objects.bulk_update(
+            recipes, ['text', 'cooking_time', 'image', 'pub_date'])
+        updated = [recipe.id for recipe in existing.values()]
+        QuantityOfIngredients.objects.filter(recipe__in=updated).delete()
+        through.objects.filter(recipies__in=updated).delete()
+        QuantityOfIngredients.objects.bulk_create(
+            QuantityOfIngredients(
+                recipe=recipe, amount=ingredient['amount'],
+                ingredient=ingredients[ingredient_key(ingredient)])
+            for recipe, (record, image) in zip(recipes, imported)
+            for ingredient in record['ingredients'])
+        through.objects.bulk_create(
+            through(recipies_id=recipe.id, tags_id=tag_id)
+            for recipe, (record, image) in zip(recipes, imported)
+            for tag_id in {tags[tag['slug']].id for tag in record['tags']})
+        # bulk_create skips the post_save receivers in food_recipies.signals;
+        # the timeline fan-out is left out on purpose.
+        store_signatures({
+            recipe.id: [ingredients[ingredient_key(ingredient)].id
+                        for ingredient in record['ingredients']]
+            for recipe, (record, image) in zip(recipes, imported)})
+        ChangeLog.objects.bulk_create(
+            ChangeLog(kind=ChangeLog.RECIPE, object_id=recipe.id)
+            for recipe in recipes)
+        recipe_ids = [recipe.id for recipe in recipes]
+        transaction.on_commit(lambda: [
+            ingredient_index.notify(recipe_id) for recipe_id in recipe_ids])
+        transaction.on_commit(bump_listing_version)
+        transaction.on_commit(bump_content_version)
+    return len(accepted) - len(skipped), len(skipped)
@@ -0,0 +1,77 @@
+import io
+import logging
+import time
+
+from django.conf import settings
+from django.db import connection, connections
+from django.urls import get_resolver
+
+from .cache import get_content_version
+from .ingredient_index import ingredient_index
+from .metrics import register_worker
+from .pdf import register_fonts
+
+logger = logging.getLogger(__name__)
+
+
+def timed(stages, name, function, *args):
+    started = time.perf_counter()
+    function(*args)
+    stages.append((name, (time.perf_counter() - started) * 1000))
+
+
+def log_stages(message, stages):
+    total = sum(elapsed for name, elapsed in stages)
+    logger.info('%s in %.0f ms (%s)', message, total, ', '.join(
+        f'{name} {elapsed:.0f} ms' for name, elapsed in stages))
+
+
+def load_urlconf():
+    # Resolving the patterns imports every view, serializer and filter.
+    get_resolver().url_patterns
+
+
+def preload():
+    # Safe to run in the gunicorn master before forking: nothing here keeps
+    # sockets or other per-process state open.
+    stages = []
+    timed(stages, 'urlconf', load_urlconf)
+    timed(stages, 'fonts', register_fonts)
+    connections.close_all()
+    log_stages('Preloaded', stages)
+
+
+def request(application, path):
+    environ = {
+        'REQUEST_METHOD': 'GET',
+        'PATH_INFO': path,
+        'QUERY_STRING': '',
+        'SERVER_NAME': 'localhost',
+        'SERVER_PORT': '80',
+        'HTTP_HOST': settings.WARMUP['HOST'],
+        'HTTP_ACCEPT': 'application/json',
+        'HTTP_ACCEPT_ENCODING': 'br, gzip',
+        'wsgi.input': io.BytesIO(),
+        'wsgi.url_scheme': 'http',
+    }
+    status = []
+    response = application(environ, lambda *args: status.append(args[0]))
+    try:
+        for _ in response:
+            pass
+    finally:
+        response.close()
+    if not status[0].startswith('200'):
+        logger.warning('Warm-up request %s answered %s', path, status[0])
+
+
+def warm_up(application):
+    register_worker()
+    stages = []
+    timed(stages, 'preload', preload)
+    timed(stages, 'database', connection.ensure_connection)
+    timed(stages, 'content version', get_content_version)
+    timed(stages, 'ingredient index', ingredient_index.sync)
+    for path in settings.WARMUP['PATHS']:
+        timed(stages, path, request, application, path)
+    log_stages('Worker warmed up', stages)
@@ -1,11 +1,18 @@
+from core.purge import DeferredDeleteAdminMixin, hide_recipes
 from django.contrib import admin
+from django.http import HttpResponse
+from django.shortcuts import get_object_or_404
+from django.urls import path, reverse
+from django.utils.html import format_html
 
-from .models import (Favorites, Ingredients, QuantityOfIngredients, Recipies,
-                     ShoppingList, Tags)
+from .models import (Favorites, Ingredients, PendingDeletion, PopularRecipes,
+                     QuantityOfIngredients, Recipies, RequestProfile,
+                     ShoppingList, ShoppingListExport, SlowQuery, Tags)
 
 
 class IngredientsInLine(admin.TabularInline):
     model = Recipies.ingredients.through
+    autocomplete_fields = ['ingredient']
 
 
 class TagsInLine(admin.TabularInline):
@@ -19,30 +26,125 @@ class TagAdmin(admin.ModelAdmin):
 
 @admin.register(Ingredients)
 class IngredientAdmin(admin.ModelAdmin):
-    list_filter = ['name']
     list_display = ['name', 'measurement_unit']
+    list_filter = ['measurement_unit']
+    search_fields = ['^name']
+    show_full_result_count = False
 
 
 @admin.register(Recipies)
-class RecipeAdmin(admin.ModelAdmin):
+class RecipeAdmin(DeferredDeleteAdminMixin, admin.ModelAdmin):
     list_display = ['name', 'author', 'count_favorite']
-    list_filter = ['name', 'author', 'tags']
+    list_filter = ['tags']
+    list_select_related = ['author']
+    search_fields = ['name', 'author__username', 'author__email']
+    autocomplete_fields = ['author']
+    show_full_result_count = False
     inlines = (IngredientsInLine, TagsInLine)
+    hide_objects = staticmethod(hide_recipes)
 
+    @admin.display(description='В избранном',
+                   ordering='favorites_count')
     def count_favorite(self, instance):
-        return instance.favorites.count()
+        return instance.favorites_count
 
 
 @admin.register(QuantityOfIngredients)
 class IngredientAmount(admin.ModelAdmin):
     list_display = ['ingredient', 'recipe', 'amount']
+    list_select_related = ['ingredient', 'recipe']
+    autocomplete_fields = ['ingredient', 'recipe']
+    show_full_result_count = False
 
 
 @admin.register(Favorites)
 class FavoriteAdmin(admin.ModelAdmin):
     list_display = ['recipe', 'user']
+    list_select_related = ['recipe', 'user']
+    autocomplete_fields = ['recipe', 'user']
+    show_full_result_count = False
 
 
 @admin.register(ShoppingList)
 class CartAdmin(admin.ModelAdmin):
     list_display = ['recipe', 'user']
+    list_select_related = ['recipe', 'user']
+    autocomplete_fields = ['recipe', 'user']
+    show_full_result_count = False
+
+
+@admin.register(PopularRecipes)
+class PopularRecipeAdmin(admin.ModelAdmin):
+    list_display = ['window', 'rank', 'recipe', 'score']
+    list_filter = ['window']
+    list_select_related = ['recipe']
+    autocomplete_fields = ['recipe']
+
+
+@admin.register(PendingDeletion)
+class PendingDeletionAdmin(admin.ModelAdmin):
+    list_display = ['kind', 'object_id', 'created']
+    list_filter = ['kind']
+
+
+@admin.register(ShoppingListExport)
+class ShoppingListExportAdmin(admin.ModelAdmin):
+    list_display = ['user', 'status', 'attempts', 'created', 'updated']
+    list_filter = ['status']
+    list_select_related = ['user']
+    autocomplete_fields = ['user']
+    exclude = ['ingredients']
+
+
+@admin.register(RequestProfile)
+class RequestProfileAdmin(admin.ModelAdmin):
+    list_display = ['created', 'method', 'path', 'view', 'status', 'mode',
+                    'duration', 'sql_count', 'sql_time', 'user', 'download']
+    list_filter = ['mode', 'status']
+    list_select_related = ['user']
+    search_fields = ['path', 'view']
+    exclude = ['data']
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def get_urls(self):
+        return [
+            path('<int:pk>/download/',
+                 self.admin_site.admin_view(self.download_view),
+                 name='food_recipies_requestprofile_download'),
+        ] + super().get_urls()
+
+    @admin.display(description='Профиль')
+    def download(self, instance):
+        return format_html('<a href="{}">Скачать</a>', reverse(
+            'admin:food_recipies_requestprofile_download',
+            args=[instance.pk]))
+
+    def download_view(self, request, pk):
+        profile = get_object_or_404(RequestProfile, pk=pk)
+        extension = ('prof' if profile.mode == RequestProfile.DETERMINISTIC
+                     else 'txt')
+        response = HttpResponse(bytes(profile.data),
+                                content_type='application/octet-stream')
+        response['Content-Disposition'] = (
+            f'attachment; filename="profile-{pk}.{extension}"')
+        return response
+
+
+@admin.register(SlowQuery)
+class SlowQueryAdmin(admin.ModelAdmin):
+    list_display = ['created', 'view', 'duration', 'sql']
+    list_filter = ['view']
+    search_fields = ['sql', 'fingerprint']
+    readonly_fields = ['fingerprint', 'sql', 'view', 'duration', 'plan',
+                       'created']
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
@@ -4,3 +4,8 @@ from django.apps import AppConfig
 class FoodConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'food_recipies'
+
+    def ready(self):
+        from core import checks  # noqa: F401
+
+        from . import signals  # noqa: F401
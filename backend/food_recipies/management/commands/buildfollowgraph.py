@@ -0,0 +1,39 @@
+import random
+import time
+
+from core.follow_graph import FollowGraph, build, save
+from django.conf import settings
+from django.core.management import BaseCommand
+
+
+class Command(BaseCommand):
+    help = ('Rebuild the follow/favorite graph behind follow suggestions; '
+            'run periodically (e.g. cron)')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--benchmark', type=int, default=0,
+                            help='Time suggestions for N random users')
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        arrays = build()
+        built = time.monotonic() - started
+        save(arrays)
+        size = sum(array.nbytes for array in arrays.values())
+        self.stdout.write(
+            f'{len(arrays["users"])} users, {len(arrays["follows"])} follows, '
+            f'{len(arrays["fans"])} favorites: {size / 2 ** 20:.1f} MiB, '
+            f'built in {built:.1f}s')
+        if options['benchmark']:
+            self.benchmark(FollowGraph(arrays, None), options['benchmark'])
+        self.stdout.write(self.style.SUCCESS('Done!'))
+
+    def benchmark(self, graph, sample_size):
+        users = graph.users.tolist()
+        sample = random.sample(users, min(sample_size, len(users)))
+        started = time.perf_counter()
+        for user_id in sample:
+            graph.suggest(user_id, settings.FOLLOW_GRAPH['LIMIT'])
+        elapsed = time.perf_counter() - started
+        self.stdout.write(
+            f'suggestions: {elapsed / len(sample) * 1000:.1f} ms/user')
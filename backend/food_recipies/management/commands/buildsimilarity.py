@@ -0,0 +1,74 @@
+import random
+import time
+from collections import defaultdict
+
+from core.similarity import similar, store_signatures
+from django.conf import settings
+from django.core.management import BaseCommand
+from django.db import transaction
+from food_recipies.models import QuantityOfIngredients
+
+
+def recipe_ingredients():
+    ingredients = defaultdict(set)
+    for recipe_id, ingredient_id in QuantityOfIngredients.objects.values_list(
+        'recipe_id', 'ingredient_id'
+    ).iterator(chunk_size=10000):
+        ingredients[recipe_id].add(ingredient_id)
+    return ingredients
+
+
+class Command(BaseCommand):
+    help = 'Rebuild MinHash signatures and LSH buckets for all recipes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--benchmark', type=int, default=0,
+                            help='Compare LSH with exact Jaccard on N recipes')
+        parser.add_argument('--no-build', action='store_true')
+
+    def handle(self, *args, **options):
+        ingredients = recipe_ingredients()
+        if not options['no_build']:
+            self.build(ingredients, options['batch_size'])
+        if options['benchmark']:
+            self.benchmark(ingredients, options['benchmark'])
+
+    def build(self, ingredients, batch_size):
+        started = time.monotonic()
+        recipe_ids = list(ingredients)
+        for start in range(0, len(recipe_ids), batch_size):
+            with transaction.atomic():
+                store_signatures({
+                    recipe_id: ingredients[recipe_id]
+                    for recipe_id in recipe_ids[start:start + batch_size]
+                })
+        self.stdout.write(self.style.SUCCESS(
+            f'{len(recipe_ids)} signatures built in '
+            f'{time.monotonic() - started:.1f}s'))
+
+    def benchmark(self, ingredients, sample_size):
+        limit = settings.SIMILAR_RECIPES_LIMIT
+        sample = random.sample(list(ingredients),
+                               min(sample_size, len(ingredients)))
+        exact_time = lsh_time = found = expected = 0
+        for recipe_id in sample:
+            started = time.perf_counter()
+            own = ingredients[recipe_id]
+            exact = sorted((
+                (len(own & other) / len(own | other), other_id)
+                for other_id, other in ingredients.items()
+                if other_id != recipe_id and own & other
+            ), reverse=True)[:limit]
+            exact_time += time.perf_counter() - started
+            started = time.perf_counter()
+            approximate = similar(recipe_id, limit)
+            lsh_time += time.perf_counter() - started
+            expected += len(exact)
+            found += len({pk for _, pk in exact}
+                         & {pk for _, pk in approximate})
+        self.stdout.write(
+            f'recall@{limit}: {found / max(expected, 1):.3f}, '
+            f'exact: {exact_time / len(sample) * 1000:.1f} ms/query, '
+            f'lsh: {lsh_time / len(sample) * 1000:.1f} ms/query'
+        )
@@ -0,0 +1,41 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management import BaseCommand
+from django.db import transaction
+from django.db.models import Exists, Max, OuterRef
+from django.utils import timezone
+from food_recipies.models import ChangeLog
+
+
+def superseded(kind):
+    newer = ChangeLog.objects.filter(
+        kind=kind, object_id=OuterRef('object_id'), id__gt=OuterRef('id'))
+    if kind != ChangeLog.RECIPE:
+        newer = newer.filter(user=OuterRef('user'))
+    return ChangeLog.objects.filter(kind=kind).filter(Exists(newer))
+
+
+class Command(BaseCommand):
+    help = 'Drop superseded change log entries and expired tombstones'
+
+    def handle(self, *args, **options):
+        for kind, _ in ChangeLog.KINDS:
+            if kind == ChangeLog.COMPACTED:
+                continue
+            deleted, _ = superseded(kind).delete()
+            self.stdout.write(f'{kind}: {deleted} superseded entries removed')
+        expired = ChangeLog.objects.filter(
+            deleted=True,
+            created__lt=timezone.now() - timedelta(
+                days=settings.CHANGES['RETENTION_DAYS'])
+        )
+        with transaction.atomic():
+            horizon = expired.aggregate(horizon=Max('id'))['horizon']
+            if horizon is not None:
+                deleted, _ = expired.delete()
+                ChangeLog.objects.filter(kind=ChangeLog.COMPACTED).delete()
+                ChangeLog.objects.create(kind=ChangeLog.COMPACTED,
+                                         object_id=horizon)
+                self.stdout.write(f'{deleted} expired tombstones removed')
+        self.stdout.write(self.style.SUCCESS('Done!'))
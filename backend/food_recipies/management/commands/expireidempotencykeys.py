@@ -0,0 +1,10 @@
+from core.idempotency import expire
+from django.core.management import BaseCommand
+
+
+class Command(BaseCommand):
+    help = 'Delete Idempotency-Key responses older than IDEMPOTENCY["TTL"]'
+
+    def handle(self, *args, **options):
+        deleted = expire()
+        self.stdout.write(self.style.SUCCESS(f'{deleted} keys deleted'))
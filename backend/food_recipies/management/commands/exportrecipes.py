@@ -0,0 +1,62 @@
+import multiprocessing
+import os
+import sys
+import time
+
+import orjson
+from core.transfer import export_image, recipe_batches, recipe_record
+from django.core.management import BaseCommand
+from django.db import connections
+
+
+class Command(BaseCommand):
+    help = ('Export recipes with their ingredients, tags and authors as '
+            'JSON Lines, one recipe per line')
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="Output file, '-' for stdout")
+        parser.add_argument('--images',
+                            help='Also copy recipe images into this directory')
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--processes', type=int, default=os.cpu_count())
+
+    def handle(self, *args, **options):
+        to_stdout = options['path'] == '-'
+        log = self.stderr if to_stdout else self.stdout
+        output = sys.stdout.buffer if to_stdout else open(
+            options['path'], 'wb')
+        pool = copying = None
+        if options['images']:
+            # Forked workers must not inherit open database connections.
+            connections.close_all()
+            pool = multiprocessing.get_context('fork').Pool(
+                options['processes'])
+        total = missing = 0
+        started = time.monotonic()
+        try:
+            for batch in recipe_batches(options['batch_size']):
+                output.write(b''.join(
+                    orjson.dumps(recipe_record(recipe)) + b'\n'
+                    for recipe in batch))
+                if pool is not None:
+                    # The previous batch's images are copied while this one
+                    # was being read.
+                    if copying is not None:
+                        missing += copying.get().count(None)
+                    copying = pool.map_async(export_image, [
+                        (options['images'], recipe.image.name)
+                        for recipe in batch])
+                total += len(batch)
+                rate = total / max(time.monotonic() - started, 1e-6)
+                log.write(f'{total} recipes exported, {rate:.0f} recipes/s')
+            if copying is not None:
+                missing += copying.get().count(None)
+        finally:
+            if pool is not None:
+                pool.close()
+                pool.join()
+            if not to_stdout:
+                output.close()
+        if missing:
+            log.write(self.style.WARNING(f'{missing} images not found'))
+        log.write(self.style.SUCCESS(f'{total} recipes exported.'))
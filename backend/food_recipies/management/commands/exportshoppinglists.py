@@ -0,0 +1,49 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from core.exports import claim, render, requeue_stale
+from django.conf import settings
+from django.core.management import BaseCommand
+from django.db import connection
+
+
+class Command(BaseCommand):
+    help = 'Render queued shopping list PDF exports'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--concurrency', type=int,
+            default=settings.SHOPPING_LIST_EXPORTS['CONCURRENCY'])
+        parser.add_argument(
+            '--interval', type=float,
+            default=settings.SHOPPING_LIST_EXPORTS['POLL_INTERVAL'],
+            help='Seconds to wait when the queue is empty')
+        parser.add_argument('--once', action='store_true',
+                            help='Exit when the queue is empty')
+
+    def handle(self, *args, **options):
+        with ThreadPoolExecutor(options['concurrency']) as pool:
+            workers = [
+                pool.submit(self.worker, options['interval'], options['once'])
+                for _ in range(options['concurrency'])
+            ]
+        for worker in workers:
+            worker.result()
+
+    def worker(self, interval, once):
+        try:
+            while True:
+                requeue_stale()
+                job = claim()
+                if job is None:
+                    if once:
+                        return
+                    time.sleep(interval)
+                    continue
+                started = time.monotonic()
+                render(job)
+                self.stdout.write(
+                    f'Export {job.pk} for user {job.user_id}: {job.status} '
+                    f'in {time.monotonic() - started:.2f} s')
+        finally:
+            connection.close()
@@ -0,0 +1,161 @@
+import csv
+import random
+from itertools import accumulate
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management import BaseCommand, call_command
+from food_recipies.models import (Favorites, Ingredients,
+                                  QuantityOfIngredients, Recipies,
+                                  ShoppingList, Tags)
+from users.models import Follower
+
+User = get_user_model()
+
+USER_PREFIX = 'loadtest'
+IMAGE = 'food_recipies/images/loadtest.png'
+TAGS = (
+    ('Завтрак', '#E26C2D', 'breakfast'),
+    ('Обед', '#49B64E', 'lunch'),
+    ('Ужин', '#8775D2', 'dinner'),
+)
+
+
+class Command(BaseCommand):
+    help = 'Generate synthetic users, recipes and activity for load tests'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--recipes', type=int, default=10000)
+        parser.add_argument('--favorites', type=int, default=100000)
+        parser.add_argument('--carts', type=int, default=20000)
+        parser.add_argument('--follows', type=int, default=20000)
+        parser.add_argument('--ingredients-per-recipe', type=int, default=8)
+        parser.add_argument('--skew', type=float, default=1.1,
+                            help='Zipf exponent of author/recipe popularity')
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--password', default=USER_PREFIX)
+        parser.add_argument('--seed', type=int)
+
+    def handle(self, *args, **options):
+        random.seed(options['seed'])
+        self.batch_size = options['batch_size']
+        self.skew = options['skew']
+        ingredients = self.load_ingredients()
+        tags = self.load_tags()
+        users = self.create_users(options['users'], options['password'])
+        recipes = self.create_recipes(
+            users, ingredients, tags, options['recipes'],
+            options['ingredients_per_recipe']
+        )
+        self.create_relations(Favorites, 'recipe_id', users, recipes,
+                              options['favorites'])
+        self.create_relations(ShoppingList, 'recipe_id', users, recipes,
+                              options['carts'])
+        self.create_relations(Follower, 'author_id', users, users,
+                              options['follows'])
+        # bulk_create skips the signals that maintain favorites_count.
+        call_command('refreshpopular', stdout=self.stdout)
+        self.stdout.write(self.style.SUCCESS('Done!'))
+
+    def zipf_picker(self, population):
+        population = list(population)
+        random.shuffle(population)
+        cum_weights = list(accumulate(
+            1 / (rank ** self.skew) for rank in range(1, len(population) + 1)
+        ))
+
+        def pick(k):
+            return random.choices(population, cum_weights=cum_weights, k=k)
+        return pick
+
+    def bulk_create(self, model, objs, **kwargs):
+        created = []
+        for start in range(0, len(objs), self.batch_size):
+            created.extend(model.objects.bulk_create(
+                objs[start:start + self.batch_size], **kwargs))
+        return created
+
+    def load_ingredients(self):
+        if not Ingredients.objects.exists():
+            with open(settings.BASE_DIR / 'data/ingredients.csv',
+                      encoding='utf-8') as file_csv:
+                self.bulk_create(Ingredients, [
+                    Ingredients(**row) for row in csv.DictReader(file_csv)
+                ])
+        return list(Ingredients.objects.values_list('id', flat=True))
+
+    def load_tags(self):
+        if not Tags.objects.exists():
+            Tags.objects.bulk_create(
+                Tags(name=name, color=color, slug=slug)
+                for name, color, slug in TAGS
+            )
+        return list(Tags.objects.values_list('id', flat=True))
+
+    def create_users(self, count, password):
+        offset = User.objects.filter(username__startswith=USER_PREFIX).count()
+        password = make_password(password)
+        self.bulk_create(User, [
+            User(username=f'{USER_PREFIX}{number}',
+                 email=f'{USER_PREFIX}{number}@example.com',
+                 first_name='Load', last_name=f'Test{number}',
+                 password=password)
+            for number in range(offset, offset + count)
+        ])
+        self.stdout.write(f'Users: {count}')
+        return list(User.objects.filter(
+            username__startswith=USER_PREFIX).values_list('id', flat=True))
+
+    def create_recipes(self, users, ingredients, tags, count, per_recipe):
+        pick_author = self.zipf_picker(users)
+        offset = Recipies.objects.count()
+        through = Recipies.tags.through
+        recipes = []
+        for start in range(0, count, self.batch_size):
+            size = min(self.batch_size, count - start)
+            batch = Recipies.objects.bulk_create(
+                Recipies(name=f'Рецепт {offset + start + number}',
+                         author_id=author, image=IMAGE,
+                         text='Сгенерированный рецепт',
+                         cooking_time=random.randint(1, 180))
+                for number, author in enumerate(pick_author(size))
+            )
+            QuantityOfIngredients.objects.bulk_create(
+                QuantityOfIngredients(recipe=recipe, ingredient_id=ingredient,
+                                      amount=random.randint(1, 500))
+                for recipe in batch
+                for ingredient in random.sample(ingredients, per_recipe)
+            )
+            through.objects.bulk_create(
+                through(recipies_id=recipe.id, tags_id=tag)
+                for recipe in batch
+                for tag in random.sample(tags, random.randint(1, len(tags)))
+            )
+            recipes.extend(recipe.id for recipe in batch)
+            self.stdout.write(f'Recipes: {len(recipes)}/{count}')
+        return recipes
+
+    def create_relations(self, model, field, users, targets, count):
+        pick_target = self.zipf_picker(targets)
+        # Only Follower has a unique constraint, so repeated pairs are
+        # skipped here; with self-follows dropped too, fewer than count rows
+        # may be inserted.
+        seen = set(model.objects.values_list('user_id', field))
+        before = len(seen)
+        for start in range(0, count, self.batch_size):
+            size = min(self.batch_size, count - start)
+            pairs = {
+                (user, target)
+                for user, target in zip(random.choices(users, k=size),
+                                        pick_target(size))
+                if field == 'recipe_id' or user != target
+            } - seen
+            seen |= pairs
+            model.objects.bulk_create(
+                model(user_id=user, **{field: target})
+                for user, target in pairs
+            )
+        created = model.objects.count() - before
+        self.stdout.write(f'{model.__name__}: {created} of {count}')
@@ -1,29 +1,128 @@
 import csv
+import io
+import json
+import re
+import time
+from itertools import islice
 
 from django.conf import settings
-from django.core.management import BaseCommand
-from food.models import Ingredient
+from django.core.management import BaseCommand, CommandError
+from django.db import connection, transaction
+from food_recipies.models import Ingredients
 
-FILE_LIST = {
-    Ingredient: 'ingredients.csv',
+FIELDS = ('name', 'measurement_unit')
+CHUNK_SIZE = 64 * 1024
+SPACES = re.compile(r'\s*')
+SEPARATORS = re.compile(r'[\s,]*')
+
+
+def read_csv(file):
+    for row in csv.DictReader(file):
+        yield row['name'].strip(), row['measurement_unit'].strip()
+
+
+def read_json(file):
+    # Rows are decoded in place at `position`; the parsed part of the buffer
+    # is dropped once per chunk, not after every row.
+    decoder = json.JSONDecoder()
+    buffer = ''
+    position = 0
+    started = False
+    while True:
+        chunk = file.read(CHUNK_SIZE)
+        buffer = buffer[position:] + chunk
+        position = 0
+        while True:
+            position = SPACES.match(buffer, position).end()
+            if not started:
+                if position == len(buffer):
+                    break
+                if buffer[position] != '[':
+                    raise CommandError('JSON file must contain an array')
+                position += 1
+                started = True
+                continue
+            position = SEPARATORS.match(buffer, position).end()
+            if buffer.startswith(']', position):
+                return
+            try:
+                row, position = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                break
+            yield row['name'].strip(), row['measurement_unit'].strip()
+        if not chunk:
+            if buffer[position:].strip():
+                raise CommandError('Unexpected end of JSON file')
+            return
+
+
+READERS = {
+    '.csv': read_csv,
+    '.json': read_json,
 }
 
 
 class Command(BaseCommand):
+    help = 'Import ingredients from CSV or JSON, skipping existing ones'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path', nargs='?',
+            default=str(settings.BASE_DIR / 'data/ingredients.csv'))
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        path = options['path']
+        reader = READERS.get(path[path.rfind('.'):].lower())
+        if reader is None:
+            raise CommandError(f'Unsupported file format: {path}')
+        if connection.vendor == 'postgresql':
+            write_batch = self.copy_batch
+            self.create_staging_table()
+        else:
+            write_batch = self.insert_batch
+        total = 0
+        started = time.monotonic()
+        with open(path, encoding='utf-8') as file:
+            rows = reader(file)
+            while True:
+                batch = list(islice(rows, options['batch_size']))
+                if not batch:
+                    break
+                with transaction.atomic():
+                    write_batch(batch)
+                total += len(batch)
+                rate = total / max(time.monotonic() - started, 1e-6)
+                self.stdout.write(f'{total} rows read, {rate:.0f} rows/s')
+        self.stdout.write(self.style.SUCCESS(f'File {path} imported.'))
+
+    def insert_batch(self, batch):
+        Ingredients.objects.bulk_create(
+            (Ingredients(name=name, measurement_unit=unit)
+             for name, unit in batch),
+            ignore_conflicts=True,
+        )
+
+    def create_staging_table(self):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'CREATE TEMP TABLE IF NOT EXISTS ingredients_staging '
+                '(name varchar(200), measurement_unit varchar(200))'
+            )
 
-    def handle(self, *args, **kwargs):
-        for model, filename in FILE_LIST.items():
-            with open(
-                f'{settings.BASE_DIR}/data/{filename}',
-                'r', encoding='utf-8'
-            ) as file_csv:
-                reader = csv.DictReader(file_csv, delimiter=',')
-                try:
-                    model.objects.bulk_create(
-                        model(**data) for data in reader)
-                    print(
-                        f'File {filename} imported.'
-                    )
-                except Exception as error:
-                    print(f'Cant import {filename}. ', error)
-        self.stdout.write(self.style.SUCCESS('Done!'))
+    def copy_batch(self, batch):
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(batch)
+        buffer.seek(0)
+        table = connection.ops.quote_name(Ingredients._meta.db_table)
+        with connection.cursor() as cursor:
+            cursor.copy_expert(
+                f'COPY ingredients_staging ({", ".join(FIELDS)}) '
+                'FROM STDIN WITH CSV', buffer)
+            cursor.execute(
+                f'INSERT INTO {table} ({", ".join(FIELDS)}) '
+                f'SELECT DISTINCT {", ".join(FIELDS)} '
+                'FROM ingredients_staging '
+                'ON CONFLICT (name, measurement_unit) DO NOTHING'
+            )
+            cursor.execute('TRUNCATE ingredients_staging')
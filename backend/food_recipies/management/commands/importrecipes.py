@@ -0,0 +1,78 @@
+import multiprocessing
+import os
+import sys
+import time
+
+import orjson
+from core.transfer import batches, import_batch, import_image
+from django.core.files.storage import default_storage
+from django.core.management import BaseCommand
+from django.db import connections
+
+
+class Command(BaseCommand):
+    help = 'Import recipes from a JSON Lines file made by exportrecipes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="Input file, '-' for stdin")
+        parser.add_argument('--images',
+                            help='Copy recipe images from this directory; '
+                                 'without it image names are kept as is')
+        parser.add_argument('--skip-existing', action='store_true',
+                            help='Leave recipes that are already there '
+                                 '(same author email and name) as they are; '
+                                 'by default they are overwritten')
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--processes', type=int, default=os.cpu_count())
+
+    def handle(self, *args, **options):
+        from_stdin = options['path'] == '-'
+        source = sys.stdin.buffer if from_stdin else open(
+            options['path'], 'rb')
+        pool = None
+        if options['images']:
+            # Forked workers must not inherit open database connections.
+            connections.close_all()
+            pool = multiprocessing.get_context('fork').Pool(
+                options['processes'])
+        total = imported = existing = missing = 0
+        started = time.monotonic()
+        try:
+            records = (orjson.loads(line) for line in source if line.strip())
+            for batch in batches(records, options['batch_size']):
+                images = [None] * len(batch)
+                if pool is not None:
+                    images = pool.map(import_image, [
+                        (options['images'], record['image'])
+                        for record in batch])
+                    missing += images.count(None)
+                try:
+                    done, skipped = import_batch(
+                        batch, images, options['skip_existing'])
+                except Exception:
+                    for name in images:
+                        if name is not None:
+                            default_storage.delete(name)
+                    raise
+                imported += done
+                existing += skipped
+                total += len(batch)
+                rate = total / max(time.monotonic() - started, 1e-6)
+                self.stdout.write(f'{total} recipes read, {imported} '
+                                  f'imported, {rate:.0f} recipes/s')
+        finally:
+            if pool is not None:
+                pool.close()
+                pool.join()
+            if not from_stdin:
+                source.close()
+        if missing:
+            self.stdout.write(self.style.WARNING(
+                f'{missing} images not found, names kept as is'))
+        if existing:
+            self.stdout.write(f'{existing} existing recipes skipped')
+        if imported + existing < total:
+            self.stdout.write(self.style.WARNING(
+                f'{total - imported - existing} recipes skipped: their '
+                'author, tags or ingredients clash with existing rows'))
+        self.stdout.write(self.style.SUCCESS(f'{imported} recipes imported.'))
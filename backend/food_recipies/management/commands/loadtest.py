@@ -0,0 +1,141 @@
+import json
+import random
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from django.core.management import BaseCommand
+
+from .generatedata import TAGS, USER_PREFIX
+
+SCENARIOS = {
+    'browse': 40,
+    'filter_by_tag': 20,
+    'recipe_detail': 15,
+    'favorite': 10,
+    'shopping_cart': 10,
+    'download_shopping_cart': 5,
+}
+
+
+def percentile(values, percent):
+    index = max(0, round(percent / 100 * len(values)) - 1)
+    return values[index]
+
+
+class Command(BaseCommand):
+    help = 'Replay a browse/filter/favorite/cart/PDF traffic mix'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://127.0.0.1:8000')
+        parser.add_argument('--concurrency', type=int, default=8)
+        parser.add_argument('--duration', type=float, default=60)
+        parser.add_argument('--users', type=int, default=50)
+        parser.add_argument('--password', default=USER_PREFIX)
+        parser.add_argument('--output', help='Write JSON report to file')
+
+    def handle(self, *args, **options):
+        self.url = options['url'].rstrip('/') + '/api'
+        self.samples = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.lock = threading.Lock()
+        self.recipes = self.recipe_ids()
+        sessions = [
+            self.login(number, options['password'])
+            for number in range(options['users'])
+        ]
+        deadline = time.monotonic() + options['duration']
+        started = time.monotonic()
+        concurrency = options['concurrency']
+        with ThreadPoolExecutor(concurrency) as pool:
+            workers = [
+                pool.submit(self.worker,
+                            sessions[number::concurrency] or sessions,
+                            deadline)
+                for number in range(concurrency)
+            ]
+        for worker in workers:
+            worker.result()
+        report = self.report(time.monotonic() - started)
+        report['config'] = {key: options[key] for key in (
+            'url', 'concurrency', 'duration', 'users')}
+        output = json.dumps(report, indent=2, sort_keys=True)
+        if options['output']:
+            with open(options['output'], 'w') as file:
+                file.write(output)
+        self.stdout.write(output)
+
+    def recipe_ids(self):
+        response = requests.get(f'{self.url}/recipes/', params={'limit': 500})
+        response.raise_for_status()
+        return [recipe['id'] for recipe in response.json()['results']]
+
+    def login(self, number, password):
+        session = requests.Session()
+        response = session.post(f'{self.url}/auth/token/login/', json={
+            'email': f'{USER_PREFIX}{number}@example.com',
+            'password': password,
+        })
+        response.raise_for_status()
+        session.headers['Authorization'] = (
+            f'Token {response.json()["auth_token"]}')
+        return session
+
+    def worker(self, sessions, deadline):
+        names, weights = zip(*SCENARIOS.items())
+        while time.monotonic() < deadline:
+            session = random.choice(sessions)
+            name = random.choices(names, weights=weights)[0]
+            getattr(self, f'scenario_{name}')(session, name)
+
+    def request(self, session, endpoint, method, path, **kwargs):
+        started = time.perf_counter()
+        try:
+            response = session.request(method, f'{self.url}{path}', **kwargs)
+            failed = response.status_code >= 500
+        except requests.RequestException:
+            failed = True
+        elapsed = time.perf_counter() - started
+        with self.lock:
+            self.samples[endpoint].append(elapsed)
+            if failed:
+                self.errors[endpoint] += 1
+
+    def scenario_browse(self, session, name):
+        self.request(session, name, 'GET', '/recipes/',
+                     params={'page': random.randint(1, 20)})
+
+    def scenario_filter_by_tag(self, session, name):
+        self.request(session, name, 'GET', '/recipes/',
+                     params={'tags': random.choice(TAGS)[2]})
+
+    def scenario_recipe_detail(self, session, name):
+        self.request(session, name, 'GET',
+                     f'/recipes/{random.choice(self.recipes)}/')
+
+    def scenario_favorite(self, session, name):
+        path = f'/recipes/{random.choice(self.recipes)}/{name}/'
+        self.request(session, f'{name}_add', 'POST', path)
+        self.request(session, f'{name}_delete', 'DELETE', path)
+
+    def scenario_shopping_cart(self, session, name):
+        self.scenario_favorite(session, name)
+
+    def scenario_download_shopping_cart(self, session, name):
+        self.request(session, name, 'GET', '/recipes/download_shopping_cart/')
+
+    def report(self, elapsed):
+        endpoints = {}
+        for endpoint, samples in self.samples.items():
+            samples.sort()
+            endpoints[endpoint] = {
+                'count': len(samples),
+                'errors': self.errors[endpoint],
+                'rps': round(len(samples) / elapsed, 2),
+                'p50_ms': round(percentile(samples, 50) * 1000, 2),
+                'p95_ms': round(percentile(samples, 95) * 1000, 2),
+                'p99_ms': round(percentile(samples, 99) * 1000, 2),
+            }
+        return {'elapsed': round(elapsed, 2), 'endpoints': endpoints}
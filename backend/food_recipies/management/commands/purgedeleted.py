@@ -0,0 +1,41 @@
+import time
+from collections import Counter
+
+from core.purge import hide_recipes, hide_users, purge_pending
+from django.core.management import BaseCommand
+
+
+class Command(BaseCommand):
+    help = 'Delete hidden users and recipes with their dependent rows'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--recipe', type=int, action='append', default=[],
+                            help='Hide and purge this recipe')
+        parser.add_argument('--user', type=int, action='append', default=[],
+                            help='Hide and purge this user')
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--interval', type=float,
+                            help='Keep polling the queue every N seconds')
+
+    def handle(self, *args, **options):
+        if options['recipe']:
+            hide_recipes(options['recipe'])
+        if options['user']:
+            hide_users(options['user'])
+        while True:
+            self.deleted = Counter()
+            started = time.monotonic()
+            purged = purge_pending(options['batch_size'], self.progress)
+            if purged:
+                self.stdout.write(self.style.SUCCESS(
+                    f'{purged} objects purged in '
+                    f'{time.monotonic() - started:.1f} s.'))
+            if options['interval'] is None:
+                break
+            time.sleep(options['interval'])
+
+    def progress(self, model, count):
+        self.deleted[model._meta.label] += count
+        self.stdout.write(
+            f'{model._meta.label}: {self.deleted[model._meta.label]} '
+            'rows deleted')
@@ -0,0 +1,62 @@
+import heapq
+from collections import Counter
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management import BaseCommand
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from food_recipies.models import (Favorites, PopularRecipes, Recipies,
+                                  ShoppingList)
+
+WINDOWS = {
+    PopularRecipes.DAY: timedelta(days=1),
+    PopularRecipes.WEEK: timedelta(days=7),
+    PopularRecipes.ALL: None,
+}
+WEIGHTS = (
+    (Favorites, 2),
+    (ShoppingList, 1),
+)
+
+
+class Command(BaseCommand):
+    help = 'Rebuild popular recipe rankings; run periodically (e.g. cron)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int,
+                            default=settings.POPULAR_RECIPES_LIMIT)
+
+    def handle(self, *args, **options):
+        now = timezone.now()
+        for window, period in WINDOWS.items():
+            scores = Counter()
+            for model, weight in WEIGHTS:
+                activity = model.objects.all()
+                if period is not None:
+                    activity = activity.filter(created__gte=now - period)
+                for recipe, total in activity.values('recipe').annotate(
+                    total=Count('id')
+                ).values_list('recipe', 'total').order_by():
+                    scores[recipe] += total * weight
+            top = heapq.nlargest(options['limit'], scores.items(),
+                                 key=lambda item: (item[1], item[0]))
+            with transaction.atomic():
+                PopularRecipes.objects.filter(window=window).delete()
+                PopularRecipes.objects.bulk_create(
+                    PopularRecipes(recipe_id=recipe, window=window,
+                                   rank=rank, score=score)
+                    for rank, (recipe, score) in enumerate(top, 1)
+                )
+            self.stdout.write(f'{window}: {len(top)} recipes')
+        # Favorites removed by core.purge skip the signals that maintain
+        # favorites_count, so drifted counters are corrected here.
+        actual = Coalesce(Subquery(
+            Favorites.objects.filter(recipe=OuterRef('pk')).order_by().values(
+                'recipe').annotate(total=Count('id')).values('total')), 0)
+        fixed = Recipies._base_manager.annotate(actual=actual).exclude(
+            favorites_count=F('actual')).update(favorites_count=actual)
+        self.stdout.write(f'favorites_count: {fixed} recipes corrected')
+        self.stdout.write(self.style.SUCCESS('Done!'))
@@ -0,0 +1,10 @@
+from core.feed import trim
+from django.core.management import BaseCommand
+
+
+class Command(BaseCommand):
+    help = 'Cut timelines back to FEED["TIMELINE_SIZE"] recipes'
+
+    def handle(self, *args, **options):
+        trimmed = trim()
+        self.stdout.write(self.style.SUCCESS(f'{trimmed} timelines trimmed'))
@@ -0,0 +1,48 @@
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('food_recipies', '0012_ingredient_unique_ingredient'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cart',
+            name='created',
+            field=models.DateTimeField(auto_now_add=True, db_index=True, default=django.utils.timezone.now, verbose_name='Добавлено'),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='favorite',
+            name='created',
+            field=models.DateTimeField(auto_now_add=True, db_index=True, default=django.utils.timezone.now, verbose_name='Добавлено'),
+            preserve_default=False,
+        ),
+        migrations.CreateModel(
+            name='PopularRecipes',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('window', models.CharField(choices=[('day', 'За сутки'), ('week', 'За неделю'), ('all', 'За всё время')], max_length=4, verbose_name='Период')),
+                ('rank', models.PositiveIntegerField(verbose_name='Место')),
+                ('score', models.PositiveIntegerField(verbose_name='Рейтинг')),
+                ('recipe', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='popularity', to='food_recipies.recipe', verbose_name='Рецепт')),
+            ],
+            options={
+                'verbose_name': 'Популярный рецепт',
+                'verbose_name_plural': 'Популярные рецепты',
+                'ordering': ('window', 'rank'),
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='popularrecipes',
+            constraint=models.UniqueConstraint(fields=('window', 'rank'), name='unique_popular_rank'),
+        ),
+        migrations.AddConstraint(
+            model_name='popularrecipes',
+            constraint=models.UniqueConstraint(fields=('window', 'recipe'), name='unique_popular_recipe'),
+        ),
+    ]
@@ -0,0 +1,47 @@
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+
+
+def count_favorites(apps, schema_editor):
+    Recipe = apps.get_model('food_recipies', 'Recipe')
+    Favorite = apps.get_model('food_recipies', 'Favorite')
+    Recipe.objects.update(favorites_count=Subquery(
+        Favorite.objects.filter(recipe=OuterRef('pk')).order_by().values(
+            'recipe').annotate(total=Count('id')).values('total')[:1]))
+    Recipe.objects.filter(favorites_count=None).update(favorites_count=0)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('food_recipies', '0020_slow_query'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='favorites_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='В избранном'),
+        ),
+        migrations.RunPython(count_favorites, migrations.RunPython.noop),
+        migrations.AlterModelOptions(
+            name='recipe',
+            options={'ordering': ('-pub_date', '-id'), 'verbose_name': 'Рецепт', 'verbose_name_plural': 'Рецепты'},
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(condition=models.Q(hidden=False), fields=['pub_date', 'id', 'cooking_time'], name='recipe_pub_date'),
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(condition=models.Q(hidden=False), fields=['cooking_time', 'id'], name='recipe_cooking_time'),
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(condition=models.Q(hidden=False), fields=['favorites_count', 'id', 'cooking_time'], name='recipe_favorites_count'),
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(condition=models.Q(hidden=False), fields=['name', 'id', 'cooking_time'], name='recipe_name'),
+        ),
+    ]
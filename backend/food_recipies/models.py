@@ -1,4 +1,5 @@
 from django.contrib.auth import get_user_model
+from django.core.serializers.json import DjangoJSONEncoder
 from django.core.validators import MinValueValidator, RegexValidator
 from django.db import models
 
@@ -20,6 +21,13 @@ class Ingredients(models.Model):
         verbose_name = 'Ингридиент'
         verbose_name_plural = 'Ингридиенты'
         ordering = ('name',)
+        constraints = [
+            models.UniqueConstraint(
+                fields=['name', 'measurement_unit'],
+                name='unique_ingredient')]
+
+    def __str__(self):
+        return f'{self.name}, {self.measurement_unit}'
 
 
 class Tags(models.Model):
@@ -44,6 +52,16 @@ class Tags(models.Model):
         verbose_name_plural = 'Теги'
         ordering = ('name',)
 
+    def __str__(self):
+        return self.name
+
+
+class RecipeManager(models.Manager):
+    # Hidden recipes are waiting for core.purge to delete them in batches.
+
+    def get_queryset(self):
+        return super().get_queryset().filter(hidden=False)
+
 
 class Recipies(models.Model):
     name = models.CharField(
@@ -67,7 +85,7 @@ class Recipies(models.Model):
     ingredients = models.ManyToManyField(
         Ingredients,
         verbose_name='Ингредиенты',
-        through='IngredientAmount',
+        through='QuantityOfIngredients',
     )
     tags = models.ManyToManyField(
         Tags,
@@ -81,11 +99,44 @@ class Recipies(models.Model):
         verbose_name='Дата',
         auto_now_add=True
     )
+    hidden = models.BooleanField(
+        verbose_name='Скрыт',
+        default=False
+    )
+    # Kept up to date by food_recipies.signals so that sorting by
+    # popularity can walk an index instead of counting favorites.
+    favorites_count = models.PositiveIntegerField(
+        verbose_name='В избранном',
+        default=0
+    )
+
+    objects = RecipeManager()
 
     class Meta:
         verbose_name = 'Рецепт'
         verbose_name_plural = 'Рецепты'
-        ordering = ('-pub_date',)
+        ordering = ('-pub_date', '-id')
+        # One index per sort key of RecipeFilter's ordering, with the id
+        # tie-breaker, scanned in either direction. The trailing
+        # cooking_time lets a range filter be checked inside the index
+        # while walking it in order. Only visible recipes are indexed,
+        # which is the condition every listing has.
+        indexes = [
+            models.Index(fields=['pub_date', 'id', 'cooking_time'],
+                         name='recipe_pub_date',
+                         condition=models.Q(hidden=False)),
+            models.Index(fields=['cooking_time', 'id'],
+                         name='recipe_cooking_time',
+                         condition=models.Q(hidden=False)),
+            models.Index(fields=['favorites_count', 'id', 'cooking_time'],
+                         name='recipe_favorites_count',
+                         condition=models.Q(hidden=False)),
+            models.Index(fields=['name', 'id', 'cooking_time'],
+                         name='recipe_name',
+                         condition=models.Q(hidden=False))]
+
+    def __str__(self):
+        return self.name
 
 
 class ShoppingList(models.Model):
@@ -101,6 +152,11 @@ class ShoppingList(models.Model):
         on_delete=models.CASCADE,
         related_name='carts',
     )
+    created = models.DateTimeField(
+        verbose_name='Добавлено',
+        auto_now_add=True,
+        db_index=True
+    )
 
     class Meta:
         verbose_name = 'Рецепт'
@@ -140,7 +196,404 @@ class Favorites(models.Model):
         on_delete=models.CASCADE,
         related_name='favorites',
     )
+    created = models.DateTimeField(
+        verbose_name='Добавлено',
+        auto_now_add=True,
+        db_index=True
+    )
 
     class Meta:
         verbose_name = 'Рецепт'
         verbose_name_plural = 'Рецепты'
+
+
+class PopularRecipes(models.Model):
+    DAY = 'day'
+    WEEK = 'week'
+    ALL = 'all'
+    WINDOWS = (
+        (DAY, 'За сутки'),
+        (WEEK, 'За неделю'),
+        (ALL, 'За всё время'),
+    )
+
+    recipe = models.ForeignKey(
+        Recipies,
+        verbose_name='Рецепт',
+        on_delete=models.CASCADE,
+        related_name='popularity',
+    )
+    window = models.CharField(
+        verbose_name='Период',
+        max_length=4,
+        choices=WINDOWS
+    )
+    rank = models.PositiveIntegerField(
+        verbose_name='Место'
+    )
+    score = models.PositiveIntegerField(
+        verbose_name='Рейтинг'
+    )
+
+    class Meta:
+        verbose_name = 'Популярный рецепт'
+        verbose_name_plural = 'Популярные рецепты'
+        ordering = ('window', 'rank')
+        constraints = [
+            models.UniqueConstraint(
+                fields=['window', 'rank'],
+                name='unique_popular_rank'),
+            models.UniqueConstraint(
+                fields=['window', 'recipe'],
+                name='unique_popular_recipe')]
+
+
+class RecipeSignature(models.Model):
+    recipe = models.OneToOneField(
+        Recipies,
+        verbose_name='Рецепт',
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='signature',
+    )
+    signature = models.BinaryField(
+        verbose_name='MinHash'
+    )
+
+    class Meta:
+        verbose_name = 'Сигнатура рецепта'
+        verbose_name_plural = 'Сигнатуры рецептов'
+
+
+class RecipeBucket(models.Model):
+    recipe = models.ForeignKey(
+        Recipies,
+        verbose_name='Рецепт',
+        on_delete=models.CASCADE,
+        related_name='buckets',
+    )
+    band = models.PositiveSmallIntegerField(
+        verbose_name='Полоса'
+    )
+    bucket = models.BigIntegerField(
+        verbose_name='Корзина'
+    )
+
+    class Meta:
+        verbose_name = 'LSH-корзина'
+        verbose_name_plural = 'LSH-корзины'
+        indexes = [
+            models.Index(fields=['band', 'bucket'], name='bucket_lookup')]
+
+
+class Timeline(models.Model):
+    user = models.ForeignKey(
+        User,
+        verbose_name='Юзер',
+        on_delete=models.CASCADE,
+        related_name='timeline',
+    )
+    recipe = models.ForeignKey(
+        Recipies,
+        verbose_name='Рецепт',
+        on_delete=models.CASCADE,
+        related_name='timeline',
+    )
+    pub_date = models.DateTimeField(
+        verbose_name='Дата'
+    )
+
+    class Meta:
+        verbose_name = 'Лента'
+        verbose_name_plural = 'Ленты'
+        ordering = ('-pub_date',)
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'recipe'],
+                name='unique_timeline_recipe')]
+        indexes = [
+            models.Index(fields=['user', '-pub_date'],
+                         name='timeline_user_date')]
+
+
+class ChangeLog(models.Model):
+    RECIPE = 'recipe'
+    FAVORITE = 'favorite'
+    SHOPPING_CART = 'shopping_cart'
+    FOLLOW = 'follow'
+    COMPACTED = 'compacted'
+    KINDS = (
+        (RECIPE, 'Рецепт'),
+        (FAVORITE, 'Избранное'),
+        (SHOPPING_CART, 'Список покупок'),
+        (FOLLOW, 'Подписка'),
+        (COMPACTED, 'Сжатие журнала'),
+    )
+
+    # No FK constraint: entries are written while a user's favorites and
+    # follows are cascade-deleted, after the collector has run.
+    user = models.ForeignKey(
+        User,
+        verbose_name='Юзер',
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        related_name='changes',
+        null=True,
+        blank=True,
+    )
+    kind = models.CharField(
+        verbose_name='Тип',
+        max_length=16,
+        choices=KINDS
+    )
+    object_id = models.PositiveBigIntegerField(
+        verbose_name='Объект'
+    )
+    deleted = models.BooleanField(
+        verbose_name='Удалён',
+        default=False
+    )
+    created = models.DateTimeField(
+        verbose_name='Дата',
+        auto_now_add=True
+    )
+
+    class Meta:
+        verbose_name = 'Изменение'
+        verbose_name_plural = 'Журнал изменений'
+        ordering = ('id',)
+        indexes = [
+            models.Index(fields=['user', 'id'], name='changelog_user_id'),
+            models.Index(fields=['kind', 'object_id'],
+                         name='changelog_kind_object')]
+
+
+class PendingDeletion(models.Model):
+    RECIPE = 'recipe'
+    USER = 'user'
+    KINDS = (
+        (RECIPE, 'Рецепт'),
+        (USER, 'Юзер'),
+    )
+
+    kind = models.CharField(
+        verbose_name='Тип',
+        max_length=6,
+        choices=KINDS
+    )
+    object_id = models.PositiveBigIntegerField(
+        verbose_name='Объект'
+    )
+    created = models.DateTimeField(
+        verbose_name='Дата',
+        auto_now_add=True
+    )
+
+    class Meta:
+        verbose_name = 'Ожидает удаления'
+        verbose_name_plural = 'Очередь удаления'
+        ordering = ('id',)
+
+
+class ShoppingListExport(models.Model):
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUSES = (
+        (PENDING, 'В очереди'),
+        (RUNNING, 'Выполняется'),
+        (DONE, 'Готово'),
+        (FAILED, 'Ошибка'),
+    )
+
+    user = models.ForeignKey(
+        User,
+        verbose_name='Юзер',
+        on_delete=models.CASCADE,
+        related_name='shopping_list_exports',
+    )
+    version = models.CharField(
+        verbose_name='Версия списка',
+        max_length=32
+    )
+    ingredients = models.JSONField(
+        verbose_name='Ингридиенты'
+    )
+    status = models.CharField(
+        verbose_name='Статус',
+        max_length=7,
+        choices=STATUSES,
+        default=PENDING
+    )
+    attempts = models.PositiveSmallIntegerField(
+        verbose_name='Попытки',
+        default=0
+    )
+    error = models.TextField(
+        verbose_name='Ошибка',
+        blank=True
+    )
+    file = models.FileField(
+        verbose_name='Файл',
+        upload_to='shopping_lists/',
+        blank=True
+    )
+    created = models.DateTimeField(
+        verbose_name='Создано',
+        auto_now_add=True
+    )
+    updated = models.DateTimeField(
+        verbose_name='Обновлено',
+        auto_now=True
+    )
+
+    class Meta:
+        verbose_name = 'Выгрузка списка покупок'
+        verbose_name_plural = 'Выгрузки списков покупок'
+        ordering = ('id',)
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'version'],
+                name='unique_shopping_list_export')]
+        indexes = [
+            models.Index(fields=['status', 'id'],
+                         name='shopping_list_export_queue')]
+
+
+class RequestProfile(models.Model):
+    DETERMINISTIC = 'cprofile'
+    SAMPLING = 'sample'
+    MODES = (
+        (DETERMINISTIC, 'cProfile'),
+        (SAMPLING, 'Сэмплирование'),
+    )
+
+    user = models.ForeignKey(
+        User,
+        verbose_name='Юзер',
+        on_delete=models.SET_NULL,
+        related_name='request_profiles',
+        null=True,
+        blank=True,
+    )
+    method = models.CharField(
+        verbose_name='Метод',
+        max_length=10
+    )
+    path = models.CharField(
+        verbose_name='Путь',
+        max_length=2000
+    )
+    view = models.CharField(
+        verbose_name='Представление',
+        max_length=200
+    )
+    status = models.PositiveSmallIntegerField(
+        verbose_name='Статус'
+    )
+    mode = models.CharField(
+        verbose_name='Профайлер',
+        max_length=8,
+        choices=MODES
+    )
+    duration = models.FloatField(
+        verbose_name='Время, мс'
+    )
+    sql_count = models.PositiveIntegerField(
+        verbose_name='SQL-запросов'
+    )
+    sql_time = models.FloatField(
+        verbose_name='Время SQL, мс'
+    )
+    sql = models.JSONField(
+        verbose_name='SQL'
+    )
+    summary = models.TextField(
+        verbose_name='Сводка'
+    )
+    data = models.BinaryField(
+        verbose_name='Профиль'
+    )
+    created = models.DateTimeField(
+        verbose_name='Дата',
+        auto_now_add=True
+    )
+
+    class Meta:
+        verbose_name = 'Профиль запроса'
+        verbose_name_plural = 'Профили запросов'
+        ordering = ('-id',)
+
+
+class SlowQuery(models.Model):
+    fingerprint = models.CharField(
+        verbose_name='Отпечаток',
+        max_length=32,
+        db_index=True
+    )
+    sql = models.TextField(
+        verbose_name='SQL'
+    )
+    view = models.CharField(
+        verbose_name='Представление',
+        max_length=200
+    )
+    duration = models.FloatField(
+        verbose_name='Время, мс'
+    )
+    plan = models.TextField(
+        verbose_name='План',
+        blank=True
+    )
+    created = models.DateTimeField(
+        verbose_name='Дата',
+        auto_now_add=True
+    )
+
+    class Meta:
+        verbose_name = 'Медленный запрос'
+        verbose_name_plural = 'Медленные запросы'
+        ordering = ('-id',)
+
+
+class IdempotencyKey(models.Model):
+    user = models.ForeignKey(
+        User,
+        verbose_name='Юзер',
+        on_delete=models.CASCADE,
+        related_name='idempotency_keys',
+    )
+    key = models.CharField(
+        verbose_name='Ключ',
+        max_length=255
+    )
+    fingerprint = models.CharField(
+        verbose_name='Отпечаток запроса',
+        max_length=32
+    )
+    # Empty until the first request with the key has finished.
+    status_code = models.PositiveSmallIntegerField(
+        verbose_name='Код ответа',
+        null=True,
+        blank=True
+    )
+    response = models.JSONField(
+        verbose_name='Ответ',
+        encoder=DjangoJSONEncoder,
+        null=True,
+        blank=True
+    )
+    created = models.DateTimeField(
+        verbose_name='Дата',
+        auto_now_add=True,
+        db_index=True
+    )
+
+    class Meta:
+        verbose_name = 'Ключ идемпотентности'
+        verbose_name_plural = 'Ключи идемпотентности'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'key'],
+                name='unique_idempotency_key')]
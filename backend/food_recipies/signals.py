@@ -0,0 +1,159 @@
+from core import feed
+from core.cache import (bump_content_version, bump_listing_version,
+                        bump_version, invalidate_recipes,
+                        user_lists_version_key)
+from core.events import broker
+from core.ingredient_index import ingredient_index
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import F
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import Signal, receiver
+from users.models import Follower
+
+from .models import (ChangeLog, Favorites, Ingredients, QuantityOfIngredients,
+                     Recipies, ShoppingList, Tags)
+
+User = get_user_model()
+
+# Sent by core.purge when recipes are hidden ahead of their batched deletion,
+# which bypasses the post_delete receivers below.
+recipes_hidden = Signal()
+
+
+def invalidate_on_commit(recipe_ids):
+    recipe_ids = list(recipe_ids)
+    transaction.on_commit(lambda: invalidate_recipes(recipe_ids))
+    transaction.on_commit(bump_listing_version)
+
+
+@receiver(post_save, sender=Recipies)
+@receiver(post_delete, sender=Recipies)
+def recipe_changed(sender, instance, **kwargs):
+    invalidate_on_commit([instance.id])
+    recipe_id = instance.id
+    transaction.on_commit(lambda: ingredient_index.notify(recipe_id))
+
+
+@receiver(recipes_hidden, sender=Recipies)
+def recipes_removed(sender, recipe_ids, **kwargs):
+    invalidate_on_commit(recipe_ids)
+    for recipe_id in recipe_ids:
+        transaction.on_commit(
+            lambda recipe_id=recipe_id: ingredient_index.notify(recipe_id))
+    ChangeLog.objects.bulk_create(
+        ChangeLog(kind=ChangeLog.RECIPE, object_id=recipe_id, deleted=True)
+        for recipe_id in recipe_ids
+    )
+
+
+@receiver(post_save, sender=QuantityOfIngredients)
+@receiver(post_delete, sender=QuantityOfIngredients)
+def recipe_ingredients_changed(sender, instance, **kwargs):
+    invalidate_on_commit([instance.recipe_id])
+
+
+@receiver(m2m_changed, sender=Recipies.tags.through)
+def recipe_tags_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if not action.startswith('post_'):
+        return
+    if not reverse:
+        invalidate_on_commit([instance.id])
+    elif pk_set:
+        invalidate_on_commit(pk_set)
+    else:
+        transaction.on_commit(bump_content_version)
+
+
+@receiver(post_save, sender=Tags)
+@receiver(post_delete, sender=Tags)
+@receiver(post_save, sender=Ingredients)
+@receiver(post_delete, sender=Ingredients)
+def reference_data_changed(sender, **kwargs):
+    transaction.on_commit(bump_content_version)
+
+
+@receiver(post_save, sender=User)
+def author_changed(sender, instance, created, update_fields, **kwargs):
+    if created or update_fields == frozenset(['last_login']):
+        return
+    invalidate_on_commit(
+        instance.recipes.values_list('id', flat=True))
+
+
+@receiver(post_save, sender=Favorites)
+@receiver(post_delete, sender=Favorites)
+@receiver(post_save, sender=ShoppingList)
+@receiver(post_delete, sender=ShoppingList)
+def recipe_list_changed(sender, instance, **kwargs):
+    key = user_lists_version_key(instance.user_id)
+    transaction.on_commit(lambda: bump_version(key))
+
+
+@receiver(post_save, sender=Favorites)
+def favorite_added(sender, instance, created, **kwargs):
+    if created:
+        Recipies._base_manager.filter(pk=instance.recipe_id).update(
+            favorites_count=F('favorites_count') + 1)
+
+
+@receiver(post_delete, sender=Favorites)
+def favorite_removed(sender, instance, **kwargs):
+    Recipies._base_manager.filter(
+        pk=instance.recipe_id, favorites_count__gt=0
+    ).update(favorites_count=F('favorites_count') - 1)
+
+
+def publish_on_commit(event_type, **event):
+    event['type'] = event_type
+    transaction.on_commit(lambda: broker.publish(event))
+
+
+@receiver(post_save, sender=Recipies)
+def recipe_created(sender, instance, created, **kwargs):
+    if created:
+        transaction.on_commit(lambda: feed.fan_out(instance))
+    publish_on_commit('recipe_created' if created else 'recipe_updated',
+                      recipe=instance.id, author=instance.author_id)
+
+
+@receiver(post_save, sender=Follower)
+def author_followed(sender, instance, created, **kwargs):
+    if created:
+        feed.backfill(instance.user_id, instance.author_id)
+        publish_on_commit('followed', user=instance.user_id,
+                          author=instance.author_id)
+
+
+@receiver(post_delete, sender=Follower)
+def author_unfollowed(sender, instance, **kwargs):
+    feed.purge(instance.user_id, instance.author_id)
+    publish_on_commit('unfollowed', user=instance.user_id,
+                      author=instance.author_id)
+
+
+@receiver(post_save, sender=Recipies)
+@receiver(post_delete, sender=Recipies)
+def log_recipe_change(sender, instance, **kwargs):
+    ChangeLog.objects.create(kind=ChangeLog.RECIPE, object_id=instance.id,
+                             deleted=kwargs['signal'] is post_delete)
+
+
+@receiver(post_save, sender=Favorites)
+@receiver(post_delete, sender=Favorites)
+@receiver(post_save, sender=ShoppingList)
+@receiver(post_delete, sender=ShoppingList)
+def log_recipe_list_change(sender, instance, **kwargs):
+    kind = ChangeLog.FAVORITE if sender is Favorites else (
+        ChangeLog.SHOPPING_CART)
+    ChangeLog.objects.create(user_id=instance.user_id, kind=kind,
+                             object_id=instance.recipe_id,
+                             deleted=kwargs['signal'] is post_delete)
+
+
+@receiver(post_save, sender=Follower)
+@receiver(post_delete, sender=Follower)
+def log_follow_change(sender, instance, **kwargs):
+    ChangeLog.objects.create(user_id=instance.user_id, kind=ChangeLog.FOLLOW,
+                             object_id=instance.author_id,
+                             deleted=kwargs['signal'] is post_delete)
@@ -32,11 +32,15 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.metrics.MetricsMiddleware',
+    'core.slow_queries.SlowQueryMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'core.compression.CompressionMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'core.profiling.ProfilerMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -47,8 +51,184 @@ REST_FRAMEWORK = {
     ],
 
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'core.authentication.CachedTokenAuthentication',
     ],
+
+    'DEFAULT_RENDERER_CLASSES': [
+        'core.renderers.ORJSONRenderer',
+        'core.renderers.MessagePackRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+}
+
+# Cache versions, token lookups, event stream tickets and the ingredient
+# index journal have to be seen by every gunicorn worker and management
+# command, so the default cache is the memcached service from
+# docker-compose. Outside docker, point CACHE_LOCATION at a memcached
+# server, or set CACHE_BACKEND to
+# 'django.core.cache.backends.locmem.LocMemCache' together with
+# TOKEN_CACHE_ENABLED=False; `manage.py check --deploy` warns about that.
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv(
+            'CACHE_BACKEND',
+            'django.core.cache.backends.memcached.PyMemcacheCache'
+        ),
+        'LOCATION': os.getenv('CACHE_LOCATION', 'memcached:11211'),
+    }
+}
+
+RECIPE_CACHE_TIMEOUT = int(os.getenv('RECIPE_CACHE_TIMEOUT', 60 * 60))
+RESPONSE_CACHE_TIMEOUT = int(os.getenv('RESPONSE_CACHE_TIMEOUT', 60 * 10))
+
+# Bodies smaller than MIN_SIZE bytes don't gain enough to pay for the CPU.
+COMPRESSION = {
+    'MIN_SIZE': int(os.getenv('COMPRESSION_MIN_SIZE', 1024)),
+    'CONTENT_TYPES': (
+        'application/json',
+        'application/msgpack',
+        'application/javascript',
+        'text/html',
+        'text/css',
+        'text/plain',
+    ),
+    'GZIP_LEVEL': 6,
+    'BROTLI_QUALITY': 5,
+}
+
+POPULAR_RECIPES_LIMIT = int(os.getenv('POPULAR_RECIPES_LIMIT', 500))
+
+# Upper bounds, in minutes, of the cooking time buckets counted by
+# /api/recipes/facets/; the last bucket is open-ended.
+FACETS = {
+    'COOKING_TIME_BUCKETS': [15, 30, 60],
+}
+
+# Follow suggestions are scored on an in-memory graph written to PATH by
+# `manage.py buildfollowgraph`. Measured with 100k users, 1M follows and
+# 1M favorites: 14 MiB of arrays held by each process and loaded in 30 ms,
+# a 7.7 s build that peaks at 70 MiB and is mostly spent reading rows, and
+# 3.5 ms to score one user. MAX_DEGREE caps each neighbour list walked.
+FOLLOW_GRAPH = {
+    'PATH': os.getenv('FOLLOW_GRAPH_PATH', BASE_DIR / 'follow_graph.npz'),
+    'LIMIT': int(os.getenv('FOLLOW_SUGGESTIONS_LIMIT', 20)),
+    'MAX_DEGREE': int(os.getenv('FOLLOW_GRAPH_MAX_DEGREE', 1000)),
+    'FAVORITE_WEIGHT': 0.2,
+    'CACHE_TIMEOUT': 60 * 60,
+}
+
+COOK_MAX_MISSING = int(os.getenv('COOK_MAX_MISSING', 5))
+COOK_RESULTS_LIMIT = int(os.getenv('COOK_RESULTS_LIMIT', 600))
+
+# 64 permutations in 16 bands of 4 rows: recipes with ingredient Jaccard
+# similarity 0.5 share a bucket with probability ~0.65, 0.7 with ~0.99.
+# More rows per band is faster and less precise on recall; rebuild with
+# `manage.py buildsimilarity` after changing these.
+MINHASH = {
+    'PERMUTATIONS': int(os.getenv('MINHASH_PERMUTATIONS', 64)),
+    'BANDS': int(os.getenv('MINHASH_BANDS', 16)),
+    'MAX_CANDIDATES': int(os.getenv('MINHASH_MAX_CANDIDATES', 500)),
+}
+SIMILAR_RECIPES_LIMIT = int(os.getenv('SIMILAR_RECIPES_LIMIT', 6))
+
+# Authors with more followers than FANOUT_LIMIT are merged into feeds at read
+# time instead of being copied into every follower's timeline. Timelines are
+# cut back to TIMELINE_SIZE by `manage.py trimtimelines`, run from cron.
+FEED = {
+    'FANOUT_LIMIT': int(os.getenv('FEED_FANOUT_LIMIT', 10000)),
+    'TIMELINE_SIZE': int(os.getenv('FEED_TIMELINE_SIZE', 1000)),
+    'CELEBRITIES_TIMEOUT': int(os.getenv('FEED_CELEBRITIES_TIMEOUT', 600)),
+}
+
+# Server-sent events are served by foodgram.asgi only, while most changes
+# are made through foodgram.wsgi, so BROKER fans events out with
+# LISTEN/NOTIFY. 'local' only works when one process serves both.
+EVENTS = {
+    'PATH': '/api/events/',
+    'BROKER': os.getenv('EVENTS_BROKER', 'postgres'),
+    'QUEUE_SIZE': 100,
+    'KEEPALIVE': 15,
+    # Seconds a ticket from /api/events_ticket/ can be used to connect.
+    # Tickets are kept in the default cache, shared by backend and events.
+    'TICKET_TTL': 30,
+}
+
+CHANGES = {
+    # Seconds an entry has to age before the change feed serves it.
+    'SETTLE': 5,
+    'PAGE_SIZE': 100,
+    'MAX_PAGE_SIZE': 1000,
+    'RETENTION_DAYS': int(os.getenv('CHANGES_RETENTION_DAYS', 30)),
+}
+
+# Token -> user lookups are kept in the shared cache for TIMEOUT seconds and
+# in a per-process LRU for LOCAL_TIMEOUT seconds. Invalidation reaches the
+# shared cache at once, other workers' LRU entries expire on their own.
+# TOKEN_CACHE_ENABLED=False turns it off; leaving it on with the
+# local-memory cache fails the checks.
+TOKEN_CACHE = {
+    'ENABLED': os.getenv('TOKEN_CACHE_ENABLED', 'True') == 'True',
+    'TIMEOUT': int(os.getenv('TOKEN_CACHE_TIMEOUT', 300)),
+    'LOCAL_TIMEOUT': int(os.getenv('TOKEN_CACHE_LOCAL_TIMEOUT', 5)),
+    'MAX_SIZE': int(os.getenv('TOKEN_CACHE_MAX_SIZE', 10000)),
+}
+
+# Workers: `manage.py exportshoppinglists`. Jobs stuck in running for
+# STALE_AFTER seconds (e.g. a killed worker) go back to the queue.
+SHOPPING_LIST_EXPORTS = {
+    'CONCURRENCY': int(os.getenv('SHOPPING_LIST_EXPORT_CONCURRENCY', 2)),
+    'RETRIES': int(os.getenv('SHOPPING_LIST_EXPORT_RETRIES', 3)),
+    'POLL_INTERVAL': 1,
+    'STALE_AFTER': 300,
+}
+
+# Staff can profile a single request with an `X-Profile: cprofile|sample`
+# header or `?profile=cprofile|sample`. Only the newest KEEP are stored.
+PROFILER = {
+    'INTERVAL': 0.005,
+    'TOP': 40,
+    'KEEP': int(os.getenv('PROFILER_KEEP', 200)),
+}
+
+# Statements slower than THRESHOLD ms are stored with their normalized SQL
+# and view. Reads get an EXPLAIN (ANALYZE, BUFFERS) on EXPLAIN_SAMPLE of
+# occurrences, at most once per COOLDOWN seconds for the same statement.
+SLOW_QUERIES = {
+    'THRESHOLD': float(os.getenv('SLOW_QUERY_THRESHOLD', 200)),
+    'EXPLAIN_SAMPLE': float(os.getenv('SLOW_QUERY_EXPLAIN_SAMPLE', 1)),
+    'COOLDOWN': 600,
+    'QUEUE_SIZE': 100,
+    'KEEP': int(os.getenv('SLOW_QUERY_KEEP', 1000)),
+}
+
+# POSTs carrying an Idempotency-Key are answered from the stored response
+# for TTL seconds. Duplicates of a request still running get 409; a key
+# whose request has run for LOCK_TIMEOUT is given up on. Expired keys are
+# deleted by `manage.py expireidempotencykeys`, run from cron.
+IDEMPOTENCY = {
+    'TTL': int(os.getenv('IDEMPOTENCY_TTL', 60 * 60 * 24)),
+    'LOCK_TIMEOUT': 120,
+}
+
+# Requests made by core.warmup when a gunicorn worker boots. HOST should be
+# the Host header nginx proxies with, so the cached responses get reused.
+WARMUP = {
+    'HOST': os.getenv('WARMUP_HOST', 'backend:8000'),
+    'PATHS': ('/api/tags/', '/api/ingredients/', '/api/recipes/'),
+}
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'core': {
+            'handlers': ['console'],
+            'level': os.getenv('CORE_LOG_LEVEL', 'INFO'),
+        },
+    },
 }
 
 ROOT_URLCONF = 'foodgram.urls'
@@ -78,7 +258,8 @@ DATABASES = {
         'USER': os.getenv('POSTGRES_USER', 'django'),
         'PASSWORD': os.getenv('POSTGRES_PASSWORD', ''),
         'HOST': os.getenv('DB_HOST', ''),
-        'PORT': os.getenv('DB_PORT', 5432)
+        'PORT': os.getenv('DB_PORT', 5432),
+        'CONN_MAX_AGE': int(os.getenv('DB_CONN_MAX_AGE', 60)),
     }
 }
 
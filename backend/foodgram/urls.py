@@ -1,9 +1,11 @@
+from core.metrics import metrics_view
 from django.conf import settings
 from django.conf.urls.static import static
 from django.contrib import admin
 from django.urls import include, path
 
 urlpatterns = [
+    path('metrics', metrics_view),
     path('admin/', admin.site.urls),
     path('api/', include('api.urls', namespace='api')),
 ]
@@ -0,0 +1,29 @@
+# Picked up automatically by gunicorn from the working directory.
+import os
+import shutil
+
+preload_app = True
+
+
+def on_starting(server):
+    directory = os.getenv('PROMETHEUS_MULTIPROC_DIR')
+    if directory:
+        shutil.rmtree(directory, ignore_errors=True)
+        os.makedirs(directory)
+    if server.cfg.preload_app:
+        from core.warmup import preload
+        preload()
+
+
+def post_worker_init(worker):
+    # The events service runs foodgram.asgi, which can't take WSGI requests.
+    if worker.cfg.worker_class_str.startswith('uvicorn'):
+        return
+    from core.warmup import warm_up
+    warm_up(worker.wsgi)
+
+
+def child_exit(server, worker):
+    if os.getenv('PROMETHEUS_MULTIPROC_DIR'):
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(worker.pid)
@@ -0,0 +1,31 @@
+from foodgram.settings import *  # noqa: F401,F403
+
+# The migrations trail the models, so the test database is built straight
+# from the models on SQLite.
+DATABASES = {
+    'default': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': ':memory:',
+    }
+}
+
+MIGRATION_MODULES = {
+    app: None for app in (
+        'admin', 'auth', 'authtoken', 'contenttypes', 'sessions',
+        'food_recipies', 'users',
+    )
+}
+
+EVENTS = {**EVENTS, 'BROKER': 'local'}  # noqa: F405
+
+# Tests run in one process, so the local-memory cache is shared enough;
+# the token cache is switched on by the tests that need it.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+
+TOKEN_CACHE = {**TOKEN_CACHE, 'ENABLED': False}  # noqa: F405
+
+PASSWORD_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
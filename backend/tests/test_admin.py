@@ -0,0 +1,43 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from food_recipies.models import Favorites, Recipies
+
+User = get_user_model()
+
+
+class RecipeAdminTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser(
+            username='admin', email='admin@example.com', password='admin',
+            first_name='Admin', last_name='Admin')
+        for index in range(3):
+            recipe = Recipies.objects.create(
+                name=f'Рецепт {index}', author=cls.admin, text='Текст',
+                image='food_recipies/images/recipe.png', cooking_time=10)
+            if index:
+                Favorites.objects.create(user=cls.admin, recipe=recipe)
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def test_changelist(self):
+        response = self.client.get('/admin/food_recipies/recipies/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['cl'].result_count, 3)
+
+    def test_changelist_ordered_by_favorites(self):
+        response = self.client.get(
+            '/admin/food_recipies/recipies/', {'o': '-3'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [recipe.favorites_count
+             for recipe in response.context['cl'].result_list],
+            [1, 1, 0])
+
+    def test_changelist_search(self):
+        response = self.client.get(
+            '/admin/food_recipies/recipies/', {'q': 'Рецепт 1'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['cl'].result_count, 1)
@@ -0,0 +1,53 @@
+from core.authentication import CachedTokenAuthentication, local_tokens
+from core.checks import LOCAL_CACHE
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from foodgram import settings as project_settings
+from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import AuthenticationFailed
+
+User = get_user_model()
+
+
+@override_settings(TOKEN_CACHE={**settings.TOKEN_CACHE, 'ENABLED': True})
+class TokenCacheTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username='user', email='user@example.com', password='user',
+            first_name='User', last_name='User')
+        cls.token = Token.objects.create(user=cls.user)
+
+    def setUp(self):
+        cache.clear()
+        local_tokens.clear()
+
+    def authenticate(self):
+        return CachedTokenAuthentication().authenticate_credentials(
+            self.token.key)[0]
+
+    def test_enabled_with_shared_cache_by_default(self):
+        self.assertTrue(project_settings.TOKEN_CACHE['ENABLED'])
+        self.assertNotEqual(
+            project_settings.CACHES['default']['BACKEND'], LOCAL_CACHE)
+
+    def test_lookup_is_cached(self):
+        self.assertEqual(self.authenticate(), self.user)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.authenticate(), self.user)
+
+    def test_login_keeps_cache(self):
+        self.authenticate()
+        self.user.save(update_fields=['last_login'])
+        with self.assertNumQueries(0):
+            self.authenticate()
+
+    def test_deactivation_clears_cache(self):
+        self.authenticate()
+        self.user.is_active = False
+        self.user.save(update_fields=['is_active'])
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate()
@@ -0,0 +1,62 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.utils import timezone
+from food_recipies.models import ChangeLog
+from rest_framework.test import APIClient
+
+User = get_user_model()
+
+
+class ChangesViewTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username='user', email='user@example.com', password='user',
+            first_name='User', last_name='User')
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def log(self, id, seconds_ago):
+        change = ChangeLog.objects.create(
+            id=id, user=self.user, kind=ChangeLog.FAVORITE, object_id=id)
+        ChangeLog.objects.filter(id=id).update(
+            created=timezone.now() - timedelta(seconds=seconds_ago))
+        return change
+
+    def changes(self, since):
+        response = self.client.get('/api/changes/', {'since': since})
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_out_of_order_commit(self):
+        # The write that took id 2 commits first, the one with id 1 later.
+        self.log(2, seconds_ago=1)
+        data = self.changes(0)
+        self.assertEqual(data['changes'], [])
+        self.assertEqual(data['cursor'], 0)
+        self.log(1, seconds_ago=1)
+        ChangeLog.objects.update(
+            created=timezone.now() - timedelta(seconds=60))
+        data = self.changes(data['cursor'])
+        self.assertEqual(
+            [change['cursor'] for change in data['changes']], [1, 2])
+        self.assertEqual(data['cursor'], 2)
+
+    def test_running_transaction_holds_cursor(self):
+        self.log(1, seconds_ago=120)
+        self.log(2, seconds_ago=60)
+        running = timezone.now() - timedelta(seconds=90)
+        with mock.patch('core.changes.oldest_transaction',
+                        return_value=running):
+            data = self.changes(0)
+        self.assertEqual(
+            [change['cursor'] for change in data['changes']], [1])
+        self.assertEqual(data['cursor'], 1)
+        self.assertEqual(
+            [change['cursor'] for change in self.changes(1)['changes']], [2])
@@ -0,0 +1,36 @@
+import tempfile
+
+from core.checks import shared_cache_check, token_cache_check
+from django.conf import settings
+from django.test import SimpleTestCase, override_settings
+
+LOCAL = {'default': {
+    'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+SHARED = {'default': {
+    'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+    'LOCATION': tempfile.gettempdir()}}
+
+
+def token_cache(enabled):
+    return {**settings.TOKEN_CACHE, 'ENABLED': enabled}
+
+
+class CacheChecksTest(SimpleTestCase):
+
+    def test_token_cache_needs_shared_backend(self):
+        with override_settings(CACHES=LOCAL, TOKEN_CACHE=token_cache(True)):
+            self.assertEqual(
+                [error.id for error in token_cache_check(None)],
+                ['core.E001'])
+        with override_settings(CACHES=SHARED, TOKEN_CACHE=token_cache(True)):
+            self.assertEqual(token_cache_check(None), [])
+        with override_settings(CACHES=LOCAL, TOKEN_CACHE=token_cache(False)):
+            self.assertEqual(token_cache_check(None), [])
+
+    def test_deploy_warns_about_local_cache(self):
+        with override_settings(CACHES=LOCAL):
+            self.assertEqual(
+                [warning.id for warning in shared_cache_check(None)],
+                ['core.W001'])
+        with override_settings(CACHES=SHARED):
+            self.assertEqual(shared_cache_check(None), [])
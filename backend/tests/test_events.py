@@ -0,0 +1,112 @@
+import base64
+import io
+import tempfile
+from unittest import mock
+
+from asgiref.sync import async_to_sync
+from core.events import events_application
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from food_recipies.models import Ingredients, Tags
+from PIL import Image
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+User = get_user_model()
+
+
+def image():
+    buffer = io.BytesIO()
+    Image.new('RGB', (1, 1)).save(buffer, 'PNG')
+    return 'data:image/png;base64,' + base64.b64encode(
+        buffer.getvalue()).decode()
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp())
+class RecipeEventsTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username='user', email='user@example.com', password='user',
+            first_name='User', last_name='User')
+        cls.tag = Tags.objects.create(name='Завтрак', color='#E26C2D',
+                                      slug='breakfast')
+        cls.ingredient = Ingredients.objects.create(name='Соль',
+                                                    measurement_unit='г')
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def recipe(self, **fields):
+        return {
+            'name': 'Омлет', 'text': 'Взбить и пожарить', 'image': image(),
+            'cooking_time': 10, 'tags': [self.tag.id],
+            'ingredients': [{'id': self.ingredient.id, 'amount': 5}],
+            **fields}
+
+    def published(self, method, url, data):
+        with mock.patch('core.events.broker.dispatch') as dispatch:
+            with self.captureOnCommitCallbacks(execute=True):
+                response = getattr(self.client, method)(
+                    url, data, format='json')
+        self.assertLess(response.status_code, 300, response.data)
+        return response, [call.args[0]['type']
+                          for call in dispatch.call_args_list]
+
+    def test_create_publishes_once(self):
+        _, events = self.published('post', '/api/recipes/', self.recipe())
+        self.assertEqual(events, ['recipe_created'])
+
+    def test_update_publishes_once(self):
+        response, _ = self.published(
+            'post', '/api/recipes/', self.recipe())
+        _, events = self.published(
+            'put', f'/api/recipes/{response.data["id"]}/',
+            self.recipe(name='Омлет с сыром'))
+        self.assertEqual(events, ['recipe_updated'])
+
+
+class EventsAuthenticationTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username='user', email='user@example.com', password='user',
+            first_name='User', last_name='User')
+        cls.token = Token.objects.create(user=cls.user)
+
+    def connect(self, query='', headers=()):
+        sent = []
+
+        async def receive():
+            return {'type': 'http.disconnect'}
+
+        async def send(message):
+            sent.append(message)
+
+        async_to_sync(events_application)({
+            'type': 'http', 'path': '/api/events/',
+            'query_string': query.encode(), 'headers': list(headers),
+        }, receive, send)
+        return sent[0]['status']
+
+    def ticket(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        response = client.post('/api/events_ticket/')
+        self.assertEqual(response.status_code, 201)
+        return response.data['ticket']
+
+    def test_ticket_is_single_use(self):
+        ticket = self.ticket()
+        self.assertEqual(self.connect(f'ticket={ticket}'), 200)
+        self.assertEqual(self.connect(f'ticket={ticket}'), 401)
+
+    def test_token_header(self):
+        header = (b'authorization', f'Token {self.token.key}'.encode())
+        self.assertEqual(self.connect(headers=[header]), 200)
+
+    def test_token_in_query_string_is_refused(self):
+        self.assertEqual(self.connect(f'token={self.token.key}'), 401)
@@ -0,0 +1,53 @@
+from datetime import timedelta
+
+from core.exports import claim, requeue_stale
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.utils import timezone
+from food_recipies.models import ShoppingListExport
+
+User = get_user_model()
+
+
+class RequeueStaleTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username='user', email='user@example.com', password='user',
+            first_name='User', last_name='User')
+
+    def job(self, version, attempts, seconds_ago):
+        job = ShoppingListExport.objects.create(
+            user=self.user, version=version, ingredients=[],
+            status=ShoppingListExport.RUNNING, attempts=attempts)
+        ShoppingListExport.objects.filter(pk=job.pk).update(
+            updated=timezone.now() - timedelta(seconds=seconds_ago))
+        return job
+
+    def status(self, job):
+        job.refresh_from_db()
+        return job.status
+
+    def test_stale_jobs_fail_after_retries(self):
+        stale_after = settings.SHOPPING_LIST_EXPORTS['STALE_AFTER']
+        retries = settings.SHOPPING_LIST_EXPORTS['RETRIES']
+        retried = self.job('a', 1, stale_after + 1)
+        exhausted = self.job('b', retries, stale_after + 1)
+        running = self.job('c', 1, 0)
+        requeue_stale()
+        self.assertEqual(self.status(retried), ShoppingListExport.PENDING)
+        self.assertEqual(self.status(exhausted), ShoppingListExport.FAILED)
+        self.assertEqual(self.status(running), ShoppingListExport.RUNNING)
+
+    def test_job_killing_its_worker_fails(self):
+        job = ShoppingListExport.objects.create(
+            user=self.user, version='a', ingredients=[])
+        for _ in range(settings.SHOPPING_LIST_EXPORTS['RETRIES']):
+            self.assertEqual(claim().pk, job.pk)
+            ShoppingListExport.objects.filter(pk=job.pk).update(
+                updated=timezone.now() - timedelta(days=1))
+            requeue_stale()
+        self.assertEqual(self.status(job), ShoppingListExport.FAILED)
+        self.assertIsNone(claim())
@@ -0,0 +1,54 @@
+from core import feed
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from food_recipies.models import Recipies, Timeline
+
+User = get_user_model()
+
+
+@override_settings(FEED={'FANOUT_LIMIT': 100, 'TIMELINE_SIZE': 3,
+                         'CELEBRITIES_TIMEOUT': 0})
+class TrimTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author, cls.reader, cls.other = [
+            User.objects.create_user(
+                username=name, email=f'{name}@example.com', password=name,
+                first_name=name, last_name=name)
+            for name in ('author', 'reader', 'other')]
+
+    def publish(self, count):
+        recipes = [
+            Recipies.objects.create(
+                name=f'Рецепт {index}', author=self.author, text='Текст',
+                image='food_recipies/images/recipe.png', cooking_time=10)
+            for index in range(count)]
+        for recipe in recipes:
+            Timeline.objects.create(user=self.reader, recipe=recipe,
+                                    pub_date=recipe.pub_date)
+        Timeline.objects.create(user=self.other, recipe=recipes[0],
+                                pub_date=recipes[0].pub_date)
+        return recipes
+
+    def test_trim_keeps_newest(self):
+        recipes = self.publish(5)
+        self.assertEqual(feed.trim(), 1)
+        self.assertEqual(
+            set(Timeline.objects.filter(user=self.reader).values_list(
+                'recipe', flat=True)),
+            {recipe.id for recipe in recipes[-3:]})
+        self.assertEqual(Timeline.objects.filter(user=self.other).count(), 1)
+
+    def test_trim_keeps_cap_on_tied_dates(self):
+        recipes = self.publish(5)
+        Timeline.objects.filter(user=self.reader).update(
+            pub_date=recipes[0].pub_date)
+        feed.trim()
+        self.assertEqual(
+            Timeline.objects.filter(user=self.reader).count(), 3)
+
+    def test_trim_skips_timelines_under_cap(self):
+        self.publish(3)
+        self.assertEqual(feed.trim(), 0)
+        self.assertEqual(Timeline.objects.count(), 4)
@@ -0,0 +1,32 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from food_recipies.models import Recipies
+from rest_framework.test import APIClient
+from users.models import Follower
+
+User = get_user_model()
+
+
+class FollowViewTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user, cls.author = [
+            User.objects.create_user(
+                username=name, email=f'{name}@example.com', password=name,
+                first_name=name, last_name=name)
+            for name in ('user', 'author')]
+        Follower.objects.create(user=cls.user, author=cls.author)
+        for index in range(3):
+            Recipies.objects.create(
+                name=f'Рецепт {index}', author=cls.author, text='Текст',
+                image='food_recipies/images/recipe.png', cooking_time=10,
+                hidden=index == 0)
+
+    def test_recipes_count_skips_hidden(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        response = client.get('/api/users/subscriptions/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['results'][0]['recipes_count'], 2)
+        self.assertEqual(len(response.data['results'][0]['recipes']), 2)
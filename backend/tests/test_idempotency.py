@@ -0,0 +1,98 @@
+from datetime import timedelta
+from io import StringIO
+
+from core.idempotency import idempotent
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+from food_recipies.models import Favorites, IdempotencyKey, Recipies
+from rest_framework import status, views
+from rest_framework.response import Response
+from rest_framework.test import (APIClient, APIRequestFactory,
+                                 force_authenticate)
+
+User = get_user_model()
+
+
+class RejectingView(views.APIView):
+    calls = 0
+
+    @idempotent
+    def post(self, request):
+        RejectingView.calls += 1
+        return Response({'detail': 'No'}, status=status.HTTP_400_BAD_REQUEST)
+
+
+class IdempotencyTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username='user', email='user@example.com', password='user',
+            first_name='User', last_name='User')
+        cls.recipe = Recipies.objects.create(
+            name='Рецепт', author=cls.user, text='Текст',
+            image='food_recipies/images/recipe.png', cooking_time=10)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.url = f'/api/recipes/{self.recipe.id}/favorite/'
+
+    def post(self, key):
+        return self.client.post(self.url, HTTP_IDEMPOTENCY_KEY=key)
+
+    def test_success_is_replayed(self):
+        first = self.post('a')
+        self.assertEqual(first.status_code, 201)
+        second = self.post('a')
+        self.assertEqual(second.status_code, 201)
+        self.assertEqual(second['Idempotent-Replayed'], 'true')
+        self.assertEqual(second.data, first.data)
+        self.assertEqual(Favorites.objects.count(), 1)
+
+    def test_raised_client_error_releases_key(self):
+        Favorites.objects.create(user=self.user, recipe=self.recipe)
+        self.assertEqual(self.post('a').status_code, 400)
+        self.assertFalse(IdempotencyKey.objects.exists())
+        Favorites.objects.all().delete()
+        response = self.post('a')
+        self.assertEqual(response.status_code, 201)
+        self.assertFalse(response.has_header('Idempotent-Replayed'))
+
+    def test_returned_client_error_releases_key(self):
+        RejectingView.calls = 0
+        view = RejectingView.as_view()
+        for _ in range(2):
+            request = APIRequestFactory().post(
+                '/', HTTP_IDEMPOTENCY_KEY='a')
+            force_authenticate(request, self.user)
+            response = view(request)
+            self.assertEqual(response.status_code, 400)
+        self.assertEqual(RejectingView.calls, 2)
+        self.assertFalse(IdempotencyKey.objects.exists())
+
+    def test_running_duplicate_gets_conflict(self):
+        self.assertEqual(self.post('a').status_code, 201)
+        # As if the first request were still in its handler.
+        IdempotencyKey.objects.update(status_code=None, response=None)
+        response = self.post('a')
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response['Retry-After'], '1')
+        self.assertEqual(IdempotencyKey.objects.count(), 1)
+
+    def test_expired_keys_are_swept_by_command(self):
+        other = User.objects.create_user(
+            username='other', email='other@example.com', password='other',
+            first_name='Other', last_name='Other')
+        old = timezone.now() - timedelta(days=2)
+        for user, key in ((self.user, 'a'), (other, 'a'), (other, 'b')):
+            IdempotencyKey.objects.create(
+                user=user, key=key, fingerprint='', status_code=201)
+        IdempotencyKey.objects.update(created=old)
+        self.assertEqual(self.post('a').status_code, 201)
+        self.assertEqual(IdempotencyKey.objects.filter(
+            created=old).count(), 2)
+        call_command('expireidempotencykeys', stdout=StringIO())
+        self.assertEqual(IdempotencyKey.objects.count(), 1)
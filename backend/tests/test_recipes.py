@@ -0,0 +1,41 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from food_recipies.models import Favorites, Recipies, ShoppingList
+from rest_framework.test import APIClient
+
+User = get_user_model()
+
+
+class RecipeFlagsTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username='user', email='user@example.com', password='user',
+            first_name='User', last_name='User')
+        cls.favorite, cls.in_cart = [
+            Recipies.objects.create(
+                name=name, author=cls.user, text='Текст',
+                image='food_recipies/images/recipe.png', cooking_time=10)
+            for name in ('Суп', 'Каша')]
+        Favorites.objects.create(user=cls.user, recipe=cls.favorite)
+        ShoppingList.objects.create(user=cls.user, recipe=cls.in_cart)
+
+    def flags(self, client, url):
+        response = client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return (response.data['is_favorited'],
+                response.data['is_in_shopping_cart'])
+
+    def test_flags_follow_the_user(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        self.assertEqual(
+            self.flags(client, f'/api/recipes/{self.favorite.id}/'),
+            (True, False))
+        self.assertEqual(
+            self.flags(client, f'/api/recipes/{self.in_cart.id}/'),
+            (False, True))
+        self.assertEqual(
+            self.flags(APIClient(), f'/api/recipes/{self.favorite.id}/'),
+            (False, False))
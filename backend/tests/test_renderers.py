@@ -0,0 +1,43 @@
+import datetime
+import json
+import uuid
+from decimal import Decimal
+
+import msgpack
+from core.renderers import MessagePackRenderer, ORJSONRenderer
+from django.test import SimpleTestCase
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+
+PAYLOADS = [
+    {'amount': Decimal('12.50'), 'cooking_time': 15},
+    {'pub_date': datetime.datetime(
+        2021, 5, 4, 12, 30, 15, 123456, tzinfo=timezone.utc)},
+    {'pub_date': datetime.datetime(2021, 5, 4, 12, 30, 15)},
+    {'date': datetime.date(2021, 5, 4), 'time': datetime.time(8, 5, 1, 500)},
+    {'duration': datetime.timedelta(minutes=90)},
+    {'id': uuid.UUID('12345678-1234-5678-1234-567812345678')},
+    {'name': 'Борщ с пампушками', 'text': 'Crème brûlée 🍮'},
+    {'text': 'line\u2028separator\u2029paragraph </script>'},
+    [{'id': 1, 'tags': [], 'image': None, 'is_favorited': False}],
+]
+
+
+class RenderersTest(SimpleTestCase):
+
+    def test_orjson_matches_stock_renderer(self):
+        for payload in PAYLOADS:
+            with self.subTest(payload=payload):
+                self.assertEqual(ORJSONRenderer().render(payload),
+                                 JSONRenderer().render(payload))
+
+    def test_msgpack_matches_stock_renderer(self):
+        for payload in PAYLOADS:
+            with self.subTest(payload=payload):
+                self.assertEqual(
+                    msgpack.unpackb(MessagePackRenderer().render(payload)),
+                    json.loads(JSONRenderer().render(payload)))
+
+    def test_empty_response(self):
+        self.assertEqual(ORJSONRenderer().render(None), b'')
+        self.assertEqual(MessagePackRenderer().render(None), b'')
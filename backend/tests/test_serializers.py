@@ -0,0 +1,148 @@
+import json
+
+from api.serializers import (CustomUsersSerializer,
+                             IngredientsQuantitySerializer)
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from drf_extra_fields.fields import Base64ImageField
+from food_recipies.models import (Favorites, Ingredients,
+                                  QuantityOfIngredients, Recipies,
+                                  ShoppingList, Tags)
+from rest_framework import serializers
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient, APIRequestFactory
+from users.models import Follower
+
+User = get_user_model()
+
+
+# The serializers as they were before lists were built from .values() rows,
+# rendered with the stock JSONRenderer.
+
+class TagsSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Tags
+        fields = ['id', 'name', 'color', 'slug']
+
+
+class IngredientsSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Ingredients
+        fields = ['id', 'name', 'measurement_unit']
+
+
+class RecipesSerializer(serializers.ModelSerializer):
+    author = CustomUsersSerializer()
+    tags = TagsSerializer(many=True)
+    ingredients = IngredientsQuantitySerializer(source='ingredient_in_recipe',
+                                                read_only=True, many=True)
+    image = Base64ImageField()
+    is_favorited = serializers.SerializerMethodField()
+    is_in_shopping_cart = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Recipies
+        fields = ['id', 'tags', 'name', 'author', 'ingredients', 'image',
+                  'text', 'cooking_time', 'is_favorited', 'is_in_shopping_cart'
+                  ]
+
+    def is_exists_in(self, obj, model):
+        request = self.context.get('request')
+        if request is None or request.user.is_anonymous:
+            return False
+        return model.objects.filter(user=request.user, recipe=obj).exists()
+
+    def get_is_favorited(self, obj):
+        return self.is_exists_in(obj, Favorites)
+
+    def get_is_in_shopping_cart(self, obj):
+        return self.is_exists_in(obj, ShoppingList)
+
+
+class ValuesOutputTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user, cls.author = [
+            User.objects.create_user(
+                username=name, email=f'{name}@example.com', password=name,
+                first_name='Имя', last_name='Фамилия')
+            for name in ('user', 'author')]
+        Follower.objects.create(user=cls.user, author=cls.author)
+        # Created out of name order, so both orderings are exercised.
+        cls.tags = [
+            Tags.objects.create(name=name, color=color, slug=slug)
+            for name, color, slug in (('Ужин', '#8775D2', 'dinner'),
+                                      ('Завтрак', '#E26C2D', 'breakfast'),
+                                      ('Обед', '#49B64E', 'lunch'))]
+        cls.ingredients = [
+            Ingredients.objects.create(name=name, measurement_unit=unit)
+            for name, unit in (('яйца', 'шт.'), ('молоко', 'мл'),
+                               ('crème fraîche', 'г'), ('соль', 'по вкусу'))]
+        cls.recipes = []
+        for index in range(4):
+            recipe = Recipies.objects.create(
+                name=f'Рецепт «{index}»', author=(cls.user, cls.author)[
+                    index % 2], text='Смешать и подать',
+                image='food_recipies/images/recipe.png',
+                cooking_time=index + 1)
+            recipe.tags.set(cls.tags[index:])
+            for amount, ingredient in enumerate(
+                    cls.ingredients[index:] + cls.ingredients[:index], 1):
+                QuantityOfIngredients.objects.create(
+                    recipe=recipe, ingredient=ingredient, amount=amount)
+            cls.recipes.append(recipe)
+        Favorites.objects.create(user=cls.user, recipe=cls.recipes[1])
+        ShoppingList.objects.create(user=cls.user, recipe=cls.recipes[2])
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def expected(self, serializer, queryset, path, wrapper=None):
+        request = APIRequestFactory().get(path)
+        request.user = self.user
+        data = serializer(queryset, many=True,
+                          context={'request': request}).data
+        if wrapper is not None:
+            data = dict(wrapper, results=data)
+        return JSONRenderer().render(data)
+
+    def test_tags(self):
+        response = self.client.get('/api/tags/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content, self.expected(
+            TagsSerializer, Tags.objects.all(), '/api/tags/'))
+
+    def test_ingredients(self):
+        response = self.client.get('/api/ingredients/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content, self.expected(
+            IngredientsSerializer, Ingredients.objects.all(),
+            '/api/ingredients/'))
+
+    def test_recipes(self):
+        response = self.client.get('/api/recipes/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content, self.expected(
+            RecipesSerializer, Recipies.objects.all(), '/api/recipes/',
+            wrapper=response.data))
+        # Served from the recipe fragment cache this time.
+        self.assertEqual(self.client.get('/api/recipes/').content,
+                         response.content)
+
+    def test_nested_order(self):
+        results = json.loads(self.client.get('/api/recipes/').content)[
+            'results']
+        for item in results:
+            recipe = Recipies.objects.get(id=item['id'])
+            self.assertEqual(
+                [tag['name'] for tag in item['tags']],
+                sorted(tag.name for tag in recipe.tags.all()))
+            self.assertEqual(
+                [ingredient['id'] for ingredient in item['ingredients']],
+                list(QuantityOfIngredients.objects.filter(
+                    recipe=recipe).order_by('id').values_list(
+                        'ingredient_id', flat=True)))
@@ -0,0 +1,28 @@
+from unittest import mock
+
+from core.slow_queries import should_explain
+from django.conf import settings
+from django.test import SimpleTestCase, override_settings
+
+
+@override_settings(SLOW_QUERIES={**settings.SLOW_QUERIES,
+                                 'EXPLAIN_SAMPLE': 1})
+@mock.patch('core.slow_queries.cache.add', return_value=True)
+class ShouldExplainTest(SimpleTestCase):
+
+    def test_plain_select(self, add):
+        self.assertTrue(should_explain(
+            'SELECT "id" FROM "recipe" WHERE "id" = %s', 'a'))
+
+    def test_skips_writes_and_locking_reads(self, add):
+        for sql in (
+            'UPDATE "recipe" SET "name" = %s',
+            'SELECT "id" FROM "job" FOR UPDATE SKIP LOCKED',
+            'SELECT "id" FROM "job" FOR NO KEY UPDATE',
+            'SELECT "id" FROM "job" for share',
+            'SELECT "id" FROM "job" FOR KEY SHARE',
+            'SELECT pg_notify(%s, %s)',
+            'SELECT pg_try_advisory_xact_lock(%s)',
+        ):
+            with self.subTest(sql=sql):
+                self.assertFalse(should_explain(sql, 'a'))
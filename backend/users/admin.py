@@ -1,15 +1,24 @@
+from core.purge import DeferredDeleteAdminMixin, hide_users
 from django.contrib import admin
 
 from .models import Follower, User
 
 
 @admin.register(User)
-class UserAdmin(admin.ModelAdmin):
-    search_fields = ('email', 'first_name')
-    list_filter = ('email', 'first_name')
+class UserAdmin(DeferredDeleteAdminMixin, admin.ModelAdmin):
+    list_display = ('username', 'email', 'first_name', 'last_name')
+    search_fields = ('email', 'username', 'first_name')
+    list_filter = ('is_staff', 'is_active')
+    show_full_result_count = False
     empty_value_display = '-пусто-'
+    hide_objects = staticmethod(hide_users)
 
 
 @admin.register(Follower)
 class FollowAdmin(admin.ModelAdmin):
+    list_display = ('user', 'author')
+    list_select_related = ('user', 'author')
+    search_fields = ('user__email', 'author__email')
+    autocomplete_fields = ('user', 'author')
+    show_full_result_count = False
     empty_value_display = '-пусто-'
@@ -0,0 +1,25 @@
+from core.authentication import invalidate_token, invalidate_user
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from .models import User
+
+
+@receiver(post_delete, sender=Token)
+def token_deleted(sender, instance, **kwargs):
+    invalidate_token(instance.key)
+
+
+# Fields the cached token.user is checked or shown by; djoser saving
+# last_login on every login leaves the cache alone.
+AUTH_FIELDS = {
+    'password', 'is_active', 'email', 'username', 'first_name', 'last_name',
+}
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, created, update_fields, **kwargs):
+    if not created and (update_fields is None
+                        or AUTH_FIELDS.intersection(update_fields)):
+        invalidate_user(instance)